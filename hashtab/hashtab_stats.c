@@ -0,0 +1,200 @@
+/*
+ * Loads the tags of Vim help tags files (vimdoc/help.tag, doc/tags) into a
+ * hash table and reports how it behaves: the load factor at every resize,
+ * perturb loops per lookup for present and missing keys, cluster lengths
+ * and, after removing part of the keys, the same with removed items.
+ *
+ * Usage: hashtab_stats [-r PERCENT] tagsfile ...
+ *
+ * Needs the library compiled with HT_DEBUG, the hashtab_debug target.
+ */
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include "libhashtab.h"
+
+static char **keys;
+static long key_count;
+static long key_alloc;
+
+static void add_key(char *key)
+{
+    if (key_count == key_alloc)
+    {
+        key_alloc = key_alloc == 0 ? 1024 : key_alloc * 2;
+        keys = realloc(keys, key_alloc * sizeof(char *));
+        if (keys == NULL)
+        {
+            fprintf(stderr, "Out of memory\n");
+            exit(1);
+        }
+    }
+    keys[key_count++] = key;
+}
+
+/*
+ * Add the tag of every line of "fname", the text before the first tab.
+ */
+static int read_tags(char *fname)
+{
+    FILE    *fd;
+    char    line[4096];
+    char    *key;
+
+    fd = fopen(fname, "r");
+    if (fd == NULL)
+    {
+        fprintf(stderr, "Unable to open %s for reading\n", fname);
+        return 0;
+    }
+    while (fgets(line, sizeof(line), fd) != NULL)
+    {
+        line[strcspn(line, "\t\r\n")] = '\0';
+        if (line[0] == '\0')
+            continue;
+        key = strdup(line);
+        if (key == NULL)
+        {
+            fprintf(stderr, "Out of memory\n");
+            exit(1);
+        }
+        add_key(key);
+    }
+    fclose(fd);
+    return 1;
+}
+
+static void report_resize(hashtab_T *ht, long_u newsize)
+{
+    long_u  oldsize = ht->ht_mask + 1;
+
+    printf("  resize %6lu -> %6lu: used %6lu, removed %6lu, load %.3f (%.3f with removed)\n",
+           oldsize, newsize, ht->ht_used, ht->ht_filled - ht->ht_used,
+           (double)ht->ht_used / oldsize, (double)ht->ht_filled / oldsize);
+}
+
+static void report_lookups(char *what)
+{
+    hashdebug_T hd;
+    int         i;
+
+    hash_debug_get(&hd);
+    if (hd.hd_lookups == 0)
+        return;
+    printf("%s: %ld lookups, %.3f perturb loops per lookup, at most %ld\n",
+           what, hd.hd_lookups, (double)hd.hd_perturbs / hd.hd_lookups, hd.hd_max_perturbs);
+    for (i = 0; i < HT_PROBE_BUCKETS; ++i)
+        if (hd.hd_perturb_hist[i] > 0)
+            printf("  %2d%s loops: %8ld  %5.1f%%\n", i, i == HT_PROBE_BUCKETS - 1 ? "+" : " ",
+                   hd.hd_perturb_hist[i], 100.0 * hd.hd_perturb_hist[i] / hd.hd_lookups);
+}
+
+static void report_table(hashtab_T *ht)
+{
+    hashstats_T hs;
+    int         i;
+
+    hash_stats(ht, &hs);
+    printf("table: %lu items, %lu used (load %.3f), %lu removed (%.1f%% of filled)\n",
+           hs.hs_size, hs.hs_used, (double)hs.hs_used / hs.hs_size, hs.hs_removed,
+           hs.hs_used + hs.hs_removed == 0 ? 0.0
+                        : 100.0 * hs.hs_removed / (hs.hs_used + hs.hs_removed));
+    printf("clusters: %lu, longest %lu\n", hs.hs_clusters, hs.hs_max_cluster);
+    for (i = 1; i < HT_CLUSTER_BUCKETS; ++i)
+        if (hs.hs_cluster_hist[i] > 0)
+            printf("  length %2d%s %8lu\n", i, i == HT_CLUSTER_BUCKETS - 1 ? "+" : " ",
+                   hs.hs_cluster_hist[i]);
+}
+
+/*
+ * Look up every key that is in "ht", then every key with a suffix that
+ * makes it one that is not.
+ */
+static void measure_lookups(hashtab_T *ht, int *removed)
+{
+    char    missing[4200];
+    long    i;
+
+    hash_debug_reset();
+    for (i = 0; i < key_count; ++i)
+        if (removed == NULL || !removed[i])
+            (void)hash_find(ht, keys[i]);
+    report_lookups("present keys");
+
+    hash_debug_reset();
+    for (i = 0; i < key_count; ++i)
+    {
+        snprintf(missing, sizeof(missing), "%s@miss", keys[i]);
+        (void)hash_find(ht, missing);
+    }
+    report_lookups("missing keys");
+}
+
+int main(int argc, char **argv)
+{
+    hashtab_T   ht;
+    hashitem_T  *hi;
+    int         *removed = NULL;
+    int         remove_percent = 0;
+    long        duplicates = 0;
+    long        i;
+    int         argi = 1;
+
+    if (argc > 2 && strcmp(argv[1], "-r") == 0)
+    {
+        remove_percent = atoi(argv[2]);
+        argi = 3;
+    }
+    if (argi >= argc || remove_percent < 0 || remove_percent > 100)
+    {
+        fprintf(stderr, "Usage: %s [-r PERCENT] tagsfile ...\n", argv[0]);
+        return 1;
+    }
+    for (; argi < argc; ++argi)
+        if (!read_tags(argv[argi]))
+            return 1;
+
+    hash_init(&ht);
+    hash_set_resize_hook(report_resize);
+    printf("adding %ld keys\n", key_count);
+    for (i = 0; i < key_count; ++i)
+        if (!hash_add(&ht, keys[i], NULL))
+            ++duplicates;
+    if (duplicates > 0)
+        printf("  %ld duplicate keys skipped\n", duplicates);
+    printf("\n");
+    report_table(&ht);
+    measure_lookups(&ht, NULL);
+
+    if (remove_percent > 0)
+    {
+        removed = calloc(key_count, sizeof(int));
+        if (removed == NULL)
+        {
+            fprintf(stderr, "Out of memory\n");
+            return 1;
+        }
+        printf("\nremoving %d%% of the keys\n", remove_percent);
+        for (i = 0; i < key_count; ++i)
+        {
+            // spread the removals evenly: remove key i when the count
+            // of keys to remove up to it grows
+            if ((i + 1) * remove_percent / 100 == i * remove_percent / 100)
+                continue;
+            hi = hash_find(&ht, keys[i]);
+            if (!HASHITEM_EMPTY(hi) && hi->hi_key == keys[i])
+                hash_remove(&ht, hi, NULL);
+            removed[i] = 1;
+        }
+        printf("\n");
+        report_table(&ht);
+        measure_lookups(&ht, removed);
+        free(removed);
+    }
+
+    hash_clear(&ht);
+    for (i = 0; i < key_count; ++i)
+        free(keys[i]);
+    free(keys);
+    return 0;
+}
@@ -1,4 +1,5 @@
 #include "libhashtab.h"
+#include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
 
@@ -8,6 +9,28 @@
 /* For removed items */
 char hash_removed;
 
+#ifdef HT_DEBUG
+static long hash_count_lookup = 0;      /* count number of hashtab lookups */
+static long hash_count_perturb = 0;     /* count number of "misses" */
+static long hash_max_perturb = 0;       /* most "misses" in one lookup */
+static long hash_perturb_hist[HT_PROBE_BUCKETS];   /* lookups by "misses" */
+static hash_resize_hook_T hash_resize_hook = NULL;
+
+/*
+ * Record that a lookup took "perturbs" perturb loops.
+ */
+static void hash_count_perturbs(long perturbs)
+{
+    hash_count_perturb += perturbs;
+    if (perturbs > hash_max_perturb)
+        hash_max_perturb = perturbs;
+    ++hash_perturb_hist[perturbs < HT_PROBE_BUCKETS ? perturbs : HT_PROBE_BUCKETS - 1];
+}
+# define LOOKUP_DONE() hash_count_perturbs(perturbs)
+#else
+# define LOOKUP_DONE()
+#endif
+
 static int hash_may_resize(hashtab_T *ht, int minitems);
 
 /*
@@ -61,33 +84,53 @@ hashitem_T *hash_lookup(hashtab_T *ht, char *key, hash_T hash)
     hashitem_T  *freeitem;
     hashitem_T  *hi;
     unsigned    idx;
+#ifdef HT_DEBUG
+    long        perturbs = 0;
+
+    ++hash_count_lookup;
+#endif
 
     idx = (unsigned)(hash & ht->ht_mask);
     hi = &ht->ht_array[idx];
 
     if (hi->hi_key == NULL)
+    {
+        LOOKUP_DONE();
         return hi;
+    }
     else if (hi->hi_key == HI_KEY_REMOVED)
         freeitem = hi;
     else if (hi->hi_hash == hash && strcmp(hi->hi_key, key) == 0)
+    {
+        LOOKUP_DONE();
         return hi;
+    }
     else
         freeitem = NULL;
 
     /* Need to search through the table to find the key */
     for (perturb = hash; ; perturb >>= PERTURB_SHIFT)
     {
+#ifdef HT_DEBUG
+        ++perturbs;     /* count a "miss" for hashtab lookup */
+#endif
         idx = (unsigned)((idx << 2U) + idx + perturb + 1U);
         hi = &ht->ht_array[idx & ht->ht_mask];
         if (hi->hi_key == NULL)
+        {
+            LOOKUP_DONE();
             return freeitem == NULL ? hi : freeitem;
+        }
         if (hi->hi_key == HI_KEY_REMOVED)
         {
             if (freeitem == NULL)
                 freeitem = hi;
         }
         else if (hi->hi_hash == hash && strcmp(hi->hi_key, key) == 0)
+        {
+            LOOKUP_DONE();
             return hi;
+        }
     }
 }
 
@@ -184,6 +227,102 @@ hash_T hash_hash(char *key)
     return hash;
 }
 
+#ifdef HT_DEBUG
+/*
+ * Get the lookup counters.
+ */
+void hash_debug_get(hashdebug_T *hd)
+{
+    hd->hd_lookups = hash_count_lookup;
+    hd->hd_perturbs = hash_count_perturb;
+    hd->hd_max_perturbs = hash_max_perturb;
+    memcpy(hd->hd_perturb_hist, hash_perturb_hist, sizeof(hash_perturb_hist));
+}
+
+/*
+ * Set the lookup counters back to zero.
+ */
+void hash_debug_reset(void)
+{
+    hash_count_lookup = 0;
+    hash_count_perturb = 0;
+    hash_max_perturb = 0;
+    memset(hash_perturb_hist, 0, sizeof(hash_perturb_hist));
+}
+
+/*
+ * Set the function called on every resize, NULL for none.
+ */
+void hash_set_resize_hook(hash_resize_hook_T hook)
+{
+    hash_resize_hook = hook;
+}
+#endif
+
+/*
+ * Print the lookup counters to stderr.  Does nothing without HT_DEBUG.
+ */
+void hash_debug_results(void)
+{
+#ifdef HT_DEBUG
+    fprintf(stderr, "Number of hashtable lookups: %ld\n", hash_count_lookup);
+    fprintf(stderr, "Number of perturb loops: %ld\n", hash_count_perturb);
+    if (hash_count_lookup > 0)
+        fprintf(stderr, "Percentage of perturb loops: %ld%%\n",
+                hash_count_perturb * 100 / hash_count_lookup);
+#endif
+}
+
+/*
+ * Fill "hs" with the layout of "ht": how full it is, how many items are
+ * removed ones, and the lengths of the clusters, the runs of items that
+ * are not NULL.  A lookup only stops at a NULL item, so it walks through
+ * removed items just like through used ones.  The array wraps around, a
+ * cluster at the end continues at the start.
+ */
+void hash_stats(hashtab_T *ht, hashstats_T *hs)
+{
+    long_u  size = ht->ht_mask + 1;
+    long_u  first_null;
+    long_u  run = 0;
+    long_u  i;
+
+    memset(hs, 0, sizeof(hashstats_T));
+    hs->hs_size = size;
+    hs->hs_used = ht->ht_used;
+    hs->hs_removed = ht->ht_filled - ht->ht_used;
+
+    /* Start after a NULL item, so that no cluster is split */
+    for (first_null = 0; first_null < size; ++first_null)
+        if (ht->ht_array[first_null].hi_key == NULL)
+            break;
+    if (first_null == size)
+    {
+        /* No NULL item at all: one cluster of everything */
+        hs->hs_clusters = 1;
+        hs->hs_max_cluster = size;
+        ++hs->hs_cluster_hist[size < HT_CLUSTER_BUCKETS ? size : HT_CLUSTER_BUCKETS - 1];
+        return;
+    }
+
+    for (i = 1; i <= size; ++i)
+    {
+        if (ht->ht_array[(first_null + i) & ht->ht_mask].hi_key != NULL)
+        {
+            ++run;
+            continue;
+        }
+        if (run > 0)
+        {
+            ++hs->hs_clusters;
+            if (run > hs->hs_max_cluster)
+                hs->hs_max_cluster = run;
+            ++hs->hs_cluster_hist[run < HT_CLUSTER_BUCKETS ? run : HT_CLUSTER_BUCKETS - 1];
+            run = 0;
+        }
+    }
+}
+
 /*
  * Resize a hashtable when it's getting too full.
  * Return FAIL when out of memory.
@@ -236,6 +375,11 @@ static int hash_may_resize(hashtab_T *ht, int minitems)
             return 0;  /* Overflow - failure */
     }
 
+#ifdef HT_DEBUG
+    if (hash_resize_hook != NULL)
+        hash_resize_hook(ht, newsize);
+#endif
+
     if (newsize == HT_INIT_SIZE)
     {
         /* Use the small array inside the hashdict structure */
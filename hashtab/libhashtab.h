@@ -41,6 +41,46 @@ typedef struct hashtable_S {
 #define FOR_ALL_HASHTAB_ITEMS(ht, hi, todo) \
     for ((hi) = (ht)->ht_array; (todo) > 0; ++(hi))
 
+/*
+ * Instrumentation, compiled in when HT_DEBUG is defined.
+ * hash_lookup() counts lookups and the perturb loops they take, and a hook
+ * can be set to see every resize.
+ */
+#ifdef HT_DEBUG
+/* Lookups taking this many perturb loops or more share the last bucket */
+#define HT_PROBE_BUCKETS 16
+
+typedef struct hashdebug_S {
+    long    hd_lookups;                             /* number of hash_lookup() calls */
+    long    hd_perturbs;                            /* number of perturb loops, "misses" */
+    long    hd_max_perturbs;                        /* most perturb loops for one lookup */
+    long    hd_perturb_hist[HT_PROBE_BUCKETS];      /* lookups by their perturb loops */
+} hashdebug_T;
+
+/* Called before the array of "ht" is replaced by one of "newsize" items */
+typedef void (*hash_resize_hook_T)(hashtab_T *ht, long_u newsize);
+
+void hash_debug_get(hashdebug_T *hd);
+void hash_debug_reset(void);
+void hash_set_resize_hook(hash_resize_hook_T hook);
+#endif
+void hash_debug_results(void);
+
+/* Clusters this long or longer share the last bucket of hs_cluster_hist */
+#define HT_CLUSTER_BUCKETS 16
+
+/* Snapshot of the layout of a hash table, filled by hash_stats() */
+typedef struct hashstats_S {
+    long_u  hs_size;                                /* number of items in the array */
+    long_u  hs_used;                                /* items with a key */
+    long_u  hs_removed;                             /* HI_KEY_REMOVED items */
+    long_u  hs_clusters;                            /* runs of non-NULL items */
+    long_u  hs_max_cluster;                         /* longest run */
+    long_u  hs_cluster_hist[HT_CLUSTER_BUCKETS];    /* runs by length, [0] unused */
+} hashstats_T;
+
+void hash_stats(hashtab_T *ht, hashstats_T *hs);
+
 /* Public API functions */
 void hash_init(hashtab_T *ht);
 int check_hashtab_frozen(hashtab_T *ht, char *command);
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+# page weight of the compact HTML output against the regular one
+#
+# Usage: bench_compact.py <tag file> <text files...>
+#
+# Renders every file both ways in memory and prints the bytes per page and
+# in total, raw and gzip-compressed, plus the stylesheet.
+
+import gzip
+import io
+import os
+import sys
+
+import vim2html
+
+def render(emitter, name, doc):
+    out_f = io.StringIO()
+    emitter(out_f, name, doc)
+    return out_f.getvalue().encode('utf-8')
+
+def sizes(data):
+    return len(data), len(gzip.compress(data, 6))
+
+def main():
+    if len(sys.argv) < 3:
+        print("usage: bench_compact.py <tag file> <text files...>", file=sys.stderr)
+        sys.exit(1)
+
+    vim2html.read_tag_file(sys.argv[1])
+    totals = [0, 0, 0, 0]
+    print(f"{'page':<24}{'html':>10}{'compact':>10}{'saved':>8}{'html.gz':>10}{'compact.gz':>12}{'saved':>8}")
+    for infile in sys.argv[2:]:
+        name = os.path.basename(infile)
+        if name.endswith('.txt'):
+            name = name[:-4]
+        doc = vim2html.read_doc(infile)
+        before = sizes(render(vim2html.emit_html, name, doc))
+        after = sizes(render(vim2html.emit_compact_html, name, doc))
+        row = before[0], after[0], before[1], after[1]
+        totals = [t + r for t, r in zip(totals, row)]
+        print(f"{name:<24}{row[0]:>10}{row[1]:>10}{1 - row[1] / row[0]:>8.1%}"
+              f"{row[2]:>10}{row[3]:>12}{1 - row[3] / row[2]:>8.1%}")
+
+    print(f"{'total':<24}{totals[0]:>10}{totals[1]:>10}{1 - totals[1] / totals[0]:>8.1%}"
+          f"{totals[2]:>10}{totals[3]:>12}{1 - totals[3] / totals[2]:>8.1%}")
+
+    print(f"{'stylesheet':<24}{len(vim2html.STYLESHEET):>10}"
+          f"{len(vim2html.compact_css(vim2html.STYLESHEET)):>10}")
+
+if __name__ == "__main__":
+    main()
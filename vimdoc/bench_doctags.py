@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+# throughput of the doctags.py scanners
+#
+# Usage: bench_doctags.py [-n COPIES] [--fuzz CASES] <text files...>
+#
+# Joins the given help files, COPIES times over (default 1), into one large
+# file, checks that every available scanner finds the same tags in it as
+# the line by line scan_file(), and prints how fast each one is.
+#
+# With --fuzz, the scanners are also compared on CASES random small files
+# made of the characters that decide what is a tag: stars, bars, "<" and
+# ">", ASCII and non-ASCII white space and line breaks.
+
+import argparse
+import io
+import random
+import sys
+import time
+
+import doctags
+
+def scan_lines(data):
+    return list(doctags.scan_file(io.TextIOWrapper(io.BytesIO(data), encoding='utf-8'), "bench.txt"))
+
+def scanners():
+    """
+    name -> function returning the tags file lines for data.
+    """
+    found = {'lines': scan_lines}
+    if doctags._doctags is not None:
+        found['native'] = lambda data: doctags._doctags.scan_tags(doctags.text_newlines(data), "bench.txt")
+    if doctags.bulkscan is not None:
+        found['bulk'] = lambda data: doctags.bulkscan.scan_tags(data, "bench.txt")
+    return found
+
+# What random files are made of, mostly the characters tags depend on
+FUZZ_PIECES = ["*", "*", "*", "|", ">", " >", "<", " ", " ", "\t", "\n", "\n", "\r\n", "\r",
+               "\u3000", "\u00a0", "\x1c", "\\", "/", "tag", "a", "\u00e9", "\u4e2d"]
+
+def fuzz(cases):
+    """
+    Compares the scanners on cases random files, printing the first file
+    they disagree on.  Returns whether they all agreed.
+    """
+    rng = random.Random(cases)
+    found = scanners()
+    for case in range(cases):
+        data = "".join(rng.choice(FUZZ_PIECES) for _ in range(rng.randrange(1, 60))).encode('utf-8')
+        results = {name: scan(data) for name, scan in found.items()}
+        if any(entries != results['lines'] for entries in results.values()):
+            print(f"case {case} differs: {data!r}")
+            for name, entries in results.items():
+                print(f"  {name}: {entries}")
+            return False
+    print(f"{cases} random files, {', '.join(found)} agree")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(prog="bench_doctags.py")
+    parser.add_argument("-n", "--copies", type=int, default=1)
+    parser.add_argument("--fuzz", type=int, default=0, metavar="CASES",
+                        help="also compare the scanners on CASES random files")
+    parser.add_argument("textfiles", nargs="+")
+    args = parser.parse_args()
+
+    parts = []
+    for name in args.textfiles:
+        with open(name, 'rb') as f:
+            data = f.read()
+        parts.append(data if data.endswith(b'\n') else data + b'\n')
+    data = b''.join(parts) * args.copies
+    megabytes = len(data) / (1024 * 1024)
+    print(f"{megabytes:.1f} MB in {len(args.textfiles) * args.copies} files")
+
+    failed = False
+    reference = None
+    for name, scan in scanners().items():
+        start = time.perf_counter()
+        entries = scan(data)
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = entries
+        same = entries == reference
+        failed = failed or not same
+        print(f"{name:<8}{elapsed:>9.3f}s{megabytes / elapsed:>9.1f} MB/s"
+              f"{len(entries):>9} tags  {'same' if same else 'DIFFERENT'}")
+
+    if args.fuzz and not fuzz(args.fuzz):
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
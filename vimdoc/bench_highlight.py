@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+# benchmark for the vim2html.py highlighter on adversarial lines
+#
+# Usage: bench_highlight.py [help files...]
+#
+# Times highlight() on long generated lines that make backtracking rules
+# quadratic, and checks that it still renders the text tokens of the given
+# help files (default: help.txt next to this script) exactly like the old
+# regex rules did.
+
+import os
+import re
+import sys
+import time
+
+import vim2html
+
+# Escaped, the largest inputs stay under vim2html.MAX_HIGHLIGHT_LENGTH, so
+# the rules themselves are measured and not the length guard
+SIZES = (4000, 8000, 16000)
+
+# name -> function building an input line of about n characters
+ADVERSARIAL = {
+    'unclosed <': lambda n: '<' * n,
+    'unclosed {': lambda n: '{' * n,
+    'unclosed < words': lambda n: '<a ' * (n // 3),
+    'heading ~': lambda n: 'x' * (n - 1) + '~',
+    'CTRL- runs': lambda n: 'CTRL-' * (n // 5),
+    'Note runs': lambda n: 'note ' * (n // 5),
+    'closed <x>': lambda n: '<x>' * (n // 3),
+    'mixed': lambda n: '<{[num ~' * (n // 8),
+}
+
+def legacy_highlight(text):
+    """
+    The highlight rules as they were before they were made linear.
+    """
+    processed_token = vim2html.esctext(text)
+    processed_token = re.sub(r'CTRL-(\w+)', r'<code class="keystroke">CTRL-\1</code>', processed_token)
+    processed_token = re.sub(r'&lt;(.*?)&gt;', r'<code class="special">&lt;\1&gt;</code>', processed_token)
+    processed_token = re.sub(r'\{([^}]*)\}', r'<code class="special">{\1}</code>', processed_token)
+    processed_token = re.sub(r'\[(range|line|count|offset|cmd|[-+]?num)\]', r'<code class="special">[\1]</code>', processed_token)
+    processed_token = re.sub(r'(Note:?)', r'<code class="note">\1</code>', processed_token, flags=re.IGNORECASE)
+    processed_token = re.sub(r'^(.*)\~$', r'<code class="section">\1</code>', processed_token)
+    return processed_token
+
+def best_time(func, arg, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def check_conformance(files):
+    """
+    Returns the number of text tokens in files that render differently.
+    """
+    tokens = 0
+    differ = 0
+    for infile in files:
+        for entry in vim2html.read_doc(infile):
+            for i in range(1, len(entry), 2):
+                if entry[i] != vim2html.TOK_TEXT:
+                    continue
+                tokens += 1
+                if vim2html.highlight(entry[i + 1]) != legacy_highlight(entry[i + 1]):
+                    differ += 1
+                    print(f"  {infile}: differs on {entry[i + 1]!r}")
+    print(f"{tokens} text tokens in {len(files)} files, {differ} render differently")
+    return differ
+
+def main():
+    files = sys.argv[1:] or [os.path.join(os.path.dirname(os.path.abspath(__file__)), 'help.txt')]
+    failed = check_conformance(files) > 0
+
+    print()
+    print(f"{'input':<18}" + "".join(f"{n:>12}" for n in SIZES) + f"{'growth':>10}{'legacy':>12}")
+    for name, build in ADVERSARIAL.items():
+        times = [best_time(vim2html.highlight, build(n)) for n in SIZES]
+        # Doubling the input of a linear rule about doubles the time
+        growth = times[-1] / max(times[-2], 1e-9)
+        legacy = best_time(legacy_highlight, build(SIZES[0]), repeat=1)
+        print(f"{name:<18}" + "".join(f"{t * 1000:>10.2f}ms" for t in times)
+              + f"{growth:>10.1f}{legacy * 1000:>10.1f}ms")
+        if growth > 3:
+            print(f"  {name}: superlinear growth")
+            failed = True
+
+    guarded = '<' * vim2html.MAX_HIGHLIGHT_LENGTH
+    print(f"\nline over the length guard ({len(guarded)} chars): "
+          f"{best_time(vim2html.highlight, guarded) * 1000:.2f}ms")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+# differential conformance check of the vim2html.py rendering strategies
+#
+# Usage: bench_strategies.py [-v] <tag file> <text files...>
+#
+# Renders every file in memory with each strategy, times it, and compares
+# the pages with those of the reference strategy: how many are the same and
+# how many lines differ.  With -v, the first differing line of every page
+# is shown.  A strategy that renders all pages like the reference one can
+# replace it.
+
+import argparse
+import difflib
+import os
+import time
+
+import vim2html
+
+# No leading zeros, so padded and unpadded stamps are the same
+DATE = ("10", "10", "2010")
+
+def render_all(tags, strategy, files):
+    """
+    Returns the pages of files, (name, data) pairs, rendered with strategy
+    and the time it took.
+    """
+    converter = vim2html.Converter(tags, strategy, DATE)
+    pages = []
+    start = time.perf_counter()
+    for name, data in files:
+        pages.append(converter.render(name, data)[2][os.path.basename(name)[:-4] + ".html"])
+    return pages, time.perf_counter() - start
+
+def differing_lines(page, reference):
+    """
+    Number of lines of page and reference that don't match up, and the
+    first pair of them.
+    """
+    a, b = reference.splitlines(), page.splitlines()
+    count = 0
+    first = None
+    for op, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if op == 'equal':
+            continue
+        count += max(i2 - i1, j2 - j1)
+        if first is None:
+            first = (a[i1] if i1 < i2 else '', b[j1] if j1 < j2 else '')
+    return count, first
+
+def main():
+    parser = argparse.ArgumentParser(prog="bench_strategies.py")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    parser.add_argument("tagfile")
+    parser.add_argument("textfiles", nargs="+")
+    args = parser.parse_args()
+
+    tags = vim2html.parse_tag_file(args.tagfile)
+    files = []
+    for name in args.textfiles:
+        if not name.endswith('.txt'):
+            continue
+        files.append((name, vim2html.read_input(name)))
+    megabytes = sum(len(data) for _, data in files) / (1024 * 1024)
+
+    reference, _ = render_all(tags, "reference", files)
+    print(f"{'strategy':<12}{'seconds':>9}{'MB/s':>8}{'same pages':>14}{'lines differ':>14}")
+    for strategy in ["reference"] + list(vim2html.STRATEGIES):
+        pages, elapsed = render_all(tags, strategy, files)
+        same = 0
+        lines = 0
+        details = []
+        for (name, _), page, ref_page in zip(files, pages, reference):
+            if page == ref_page:
+                same += 1
+                continue
+            count, first = differing_lines(page, ref_page)
+            lines += count
+            details.append((name, count, first))
+        print(f"{strategy:<12}{elapsed:>9.3f}{megabytes / elapsed:>8.1f}"
+              f"{same:>8}/{len(files):<5}{lines:>14}")
+        if args.verbose:
+            for name, count, (ref_line, line) in details:
+                print(f"  {os.path.basename(name)}: {count} lines, first:")
+                print(f"    reference: {ref_line[:100]!r}")
+                print(f"    {strategy + ':':<10} {line[:100]!r}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+# in-process thread scaling of vim2html.Converter
+#
+# Usage: bench_threads.py [-t THREADS] [-n ROUNDS] <tag file> <text files...>
+#
+# Renders every file in memory with one shared converter, first in the
+# main thread, then with a thread pool of each size in THREADS (default
+# 1,2,4,8), and checks that the threads render the same pages and find
+# the same bad links.  Reports seconds and speedup over the main thread.
+# With the GIL the speedup stays near 1; run it with a free-threaded
+# build (python3.13t) to see real cores used inside one process.
+
+import argparse
+import concurrent.futures
+import os
+import sys
+import time
+
+import vim2html
+
+def render_all(converter, files, pool=None):
+    """
+    Returns the results of rendering files, (name, data) pairs, in file
+    order.
+    """
+    if pool is None:
+        return [converter.render(name, data) for name, data in files]
+    return list(pool.map(lambda item: converter.render(*item), files))
+
+def timed(rounds, func, *args):
+    """
+    The result of func(*args) and the best time of rounds calls.
+    """
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(prog="bench_threads.py")
+    parser.add_argument("-t", "--threads", default="1,2,4,8",
+                        help="comma separated thread pool sizes (default: 1,2,4,8)")
+    parser.add_argument("-n", "--rounds", type=int, default=3,
+                        help="best of ROUNDS runs (default: 3)")
+    parser.add_argument("tagfile")
+    parser.add_argument("textfiles", nargs="+")
+    args = parser.parse_args()
+
+    converter = vim2html.Converter(vim2html.parse_tag_file(args.tagfile), date=("01", "01", "2000"))
+    files = [(name, vim2html.read_input(name)) for name in args.textfiles if name.endswith('.txt')]
+    megabytes = sum(len(data) for _, data in files) / (1024 * 1024)
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}, "
+          f"{os.cpu_count()} CPUs, {len(files)} files, {megabytes:.1f} MB")
+
+    expected, base = timed(args.rounds, render_all, converter, files)
+    print(f"{'threads':>8}{'seconds':>10}{'MB/s':>8}{'speedup':>9}")
+    print(f"{'main':>8}{base:>10.3f}{megabytes / base:>8.1f}{1:>9.2f}")
+    for threads in map(int, args.threads.split(",")):
+        with concurrent.futures.ThreadPoolExecutor(threads) as pool:
+            results, elapsed = timed(args.rounds, render_all, converter, files, pool)
+        if results != expected:
+            print(f"{threads} threads rendered differently", file=sys.stderr)
+            sys.exit(1)
+        print(f"{threads:>8}{elapsed:>10.3f}{megabytes / elapsed:>8.1f}{base / elapsed:>9.2f}")
+
+if __name__ == "__main__":
+    main()
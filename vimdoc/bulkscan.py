@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+# whole-file tag scan for doctags.py, with NumPy
+#
+# doctags.scan_file() walks a help file line by line and star by star.  For
+# large files scan_tags() does the same work on arrays: it finds all stars,
+# newlines and white space of the file at once, works out which lines are
+# example lines and which star pairs form tags, and leaves only the tags
+# themselves to Python.  The result is the same, line for line.
+#
+# The per-byte work treats ASCII white space; the few places where a byte
+# of a non-ASCII character decides (a multi-byte space before or after a
+# star, at the start or end of a line) are checked on the decoded text.
+
+import numpy as np
+
+# str.isspace() of every ASCII character, by byte value
+ASCII_SPACE = np.zeros(256, dtype=bool)
+ASCII_SPACE[[ord(c) for c in map(chr, range(128)) if c.isspace()]] = True
+
+def char_before(data, pos):
+    """
+    The character ending just before byte pos of UTF-8 data.
+    """
+    start = pos - 1
+    while start > 0 and pos - start < 4 and 0x80 <= data[start] < 0xC0:
+        start -= 1
+    return data[start:pos].decode('utf-8', errors='replace')[-1:]
+
+def char_at(data, pos):
+    """
+    The character starting at byte pos of UTF-8 data.
+    """
+    return data[pos:pos + 4].decode('utf-8', errors='ignore')[:1]
+
+def scan_tags(data, filename):
+    """
+    Returns the tags file lines for the tags defined in data, the bytes of
+    a help file, like doctags.scan_file() yields them for the same file
+    opened in text mode.
+    """
+    if not data.isascii():
+        # Raise on bad UTF-8 like reading the file as text does
+        data.decode('utf-8')
+    if b'\r' in data:
+        data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    if not data:
+        return []
+    buf = np.frombuffer(data, dtype=np.uint8)
+    size = len(buf)
+
+    # Lines: [line_start, line_end), line_end is the newline or the end
+    newlines = np.flatnonzero(buf == ord('\n'))
+    line_end = newlines if data.endswith(b'\n') else np.append(newlines, size)
+    line_start = np.concatenate(([0], line_end[:-1] + 1))
+    nlines = len(line_start)
+
+    # A line starting with white space (or empty) stays in an example
+    first = buf[line_start]
+    blank_first = ASCII_SPACE[first]
+    for i in np.flatnonzero(first >= 0xC0).tolist():
+        blank_first[i] = char_at(data, int(line_start[i])).isspace()
+
+    # A line whose stripped text is ">" or ends in " >" starts an example.
+    # Such a ">" is followed by the newline, or by white space that is
+    # checked on the text.
+    gts = np.flatnonzero(buf == ord('>'))
+    gt_line = np.searchsorted(line_end, gts)
+    follow = buf[np.minimum(gts + 1, size - 1)]
+    line_done = (gts + 1 == line_end[gt_line])
+    spaced = (gts == line_start[gt_line]) | (buf[np.maximum(gts - 1, 0)] == ord(' '))
+    is_start = np.zeros(nlines, dtype=bool)
+    is_start[gt_line[line_done & spaced]] = True
+    for i in np.unique(gt_line[~line_done & (ASCII_SPACE[follow] | (follow >= 0xC0))]).tolist():
+        stripped = data[line_start[i]:line_end[i]].decode('utf-8').rstrip()
+        is_start[i] = stripped == '>' or stripped.endswith(' >')
+
+    # A blank-first line is skipped when a start line comes after the last
+    # line that is not blank-first; start lines define no tags either
+    starts_before = np.concatenate(([0], np.cumsum(is_start)))
+    line_num = np.arange(nlines)
+    last_text_line = np.maximum.accumulate(np.where(blank_first, 0, line_num))
+    skipped = blank_first & (starts_before[line_num] - starts_before[last_text_line] > 0)
+    scanned = ~skipped & ~is_start
+
+    # Star pairs: consecutive stars on one line with a non-empty tag free of
+    # space, tab and "|" between them.  Of a run of such pairs the first,
+    # third, ... are taken, as the scan resumes after a taken pair and one
+    # star further otherwise.
+    stars = np.flatnonzero(buf == ord('*'))
+    if len(stars) < 2:
+        return []
+    star_line = np.searchsorted(line_end, stars)
+    left, right = stars[:-1], stars[1:]
+    good = (right > left + 1) & (star_line[:-1] == star_line[1:])
+    # Look at the bytes between the stars of those pairs only
+    inner = np.flatnonzero(good)
+    lengths = right[inner] - left[inner] - 1
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    positions = np.arange(lengths.sum()) + np.repeat(left[inner] + 1 - offsets, lengths)
+    content = buf[positions]
+    bad = (content == ord(' ')) | (content == ord('\t')) | (content == ord('|'))
+    if len(inner):
+        good[inner] = np.add.reduceat(bad, offsets) == 0
+
+    # Position of each pair in its run of good pairs
+    pair_num = np.arange(len(good))
+    run_start = np.maximum.accumulate(np.where(good, 0, pair_num + 1))
+    taken = good & ((pair_num - run_start) % 2 == 0) & scanned[star_line[:-1]]
+
+    left, right = left[taken], right[taken]
+    pair_line = star_line[:-1][taken]
+
+    # White space (or the line boundary) on both sides; a non-ASCII
+    # neighbour is checked on the text
+    prev = buf[np.maximum(left - 1, 0)]
+    nxt = buf[np.minimum(right + 1, size - 1)]
+    valid_start = (left == line_start[pair_line]) | ASCII_SPACE[prev]
+    valid_end = (right + 1 >= size) | ASCII_SPACE[nxt]
+    check_start = ~valid_start & (prev >= 0x80)
+    check_end = ~valid_end & (nxt >= 0xC0)
+    keep = (valid_start | check_start) & (valid_end | check_end)
+
+    result = []
+    for start, end, chk_start, chk_end in zip(left[keep].tolist(), right[keep].tolist(),
+                                             check_start[keep].tolist(), check_end[keep].tolist()):
+        if chk_start and not char_before(data, start).isspace():
+            continue
+        if chk_end and not char_at(data, end + 1).isspace():
+            continue
+        tag = data[start + 1:end].decode('utf-8')
+        escaped_tag = tag.replace('\\', '\\\\').replace('/', '\\/')
+        result.append(f"{tag}\t{filename}\t/*{escaped_tag}*")
+    return result
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+# reading help files that are shipped compressed
+#
+# Distributions often install help files as foo.txt.gz.  These helpers open
+# such files as a decompressing stream and give the name of the file inside,
+# foo.txt, which is what tags files and output names refer to.
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+
+# Compression suffix -> module with open() and decompress() for it
+DECOMPRESSORS = {
+    '.gz': gzip,
+    '.bz2': bz2,
+    '.xz': lzma,
+}
+
+# What reading a damaged compressed file can raise: OSError for bad gzip
+# and bz2 data, EOFError for a truncated stream, LZMAError for bad .xz data
+DECOMPRESS_ERRORS = (OSError, EOFError, lzma.LZMAError)
+
+def inner_name(path):
+    """
+    path without its compression suffix, if it has one.
+    """
+    root, ext = os.path.splitext(path)
+    if ext in DECOMPRESSORS:
+        return root
+    return path
+
+def open_binary(path):
+    """
+    Opens path for reading bytes, decompressing on the fly if its name has
+    a compression suffix.
+    """
+    module = DECOMPRESSORS.get(os.path.splitext(path)[1])
+    if module is None:
+        return open(path, 'rb')
+    return module.open(path, 'rb')
+
+def open_text(path, errors='strict'):
+    """
+    Opens path as UTF-8 text with universal newlines, like open(path, 'r'),
+    decompressing on the fly if its name has a compression suffix.
+    """
+    return io.TextIOWrapper(open_binary(path), encoding='utf-8', errors=errors)
+
+def decompress(path, data):
+    """
+    The decompressed content of path, given the bytes data read from it.
+    """
+    module = DECOMPRESSORS.get(os.path.splitext(path)[1])
+    if module is None:
+        return data
+    return module.decompress(data)
@@ -3,21 +3,65 @@
 This program creates a tags file for help text.
 
 Usage: doctags *.txt ... >tags
+       doctags -d dir *.txt *.??x ...
+       doctags -u tags *.txt *.??x ...
 
 In this context, a tag is an identifier between stars, e.g. *c_files*
+
+Help files compressed with gzip, bzip2 or xz (foo.txt.gz) are read as they
+are; their tags refer to the name inside (foo.txt), as Vim expects.
+
+Translated help files (foo.jax, foo.cnx, ...) have a tags file per
+language, tags-ja, tags-cn, ..., like :helptags writes them.  With -d the
+tags of every language are written into that directory, one file per
+language; with -u, the English tags file is the one given and the other
+languages go to tags-xy next to it.
+
+With -u the tags file is updated in place: only files whose size, mtime
+and content hash changed since the last run are rescanned, and their
+entries are spliced into the existing sorted tags file.
+
+When the _doctags extension is built (see CMakeLists.txt), files are
+scanned with the C code of doctags.c.  Otherwise, when NumPy is installed,
+large files are scanned with bulkscan.py, which finds the tags of a whole
+file with array operations.  Both give the same tags as scan_file().
 """
 
+import argparse
+import hashlib
+import heapq
+import io
+import json
+import os
 import sys
 from pathlib import Path
-from typing import TextIO
+from typing import Dict, Iterator, List, TextIO
 
-def process_file(file_handle: TextIO, filename: str) -> None:
+from compressed import DECOMPRESS_ERRORS, decompress, inner_name, open_binary
+from helplang import help_language, help_tags_line, tags_name
+
+try:
+    import _doctags
+except ImportError:
+    _doctags = None
+
+try:
+    import bulkscan
+except ImportError:
+    bulkscan = None
+
+HELP_TAGS_LINE = help_tags_line("")
+# Files smaller than this are scanned line by line even with NumPy, setting
+# up the arrays costs more than it saves
+BULK_SCAN_MIN_SIZE = 64 * 1024
+
+def scan_file(file_handle: TextIO, filename: str) -> Iterator[str]:
     """
-    Process a single file and generate tags.
+    Yield the tags file lines for the tags defined in a single file.
     Skip sections that are examples (marked by lines ending with '>' or ' >').
     """
     in_example = False
-    
+
     for line in file_handle:
         # Handle example sections
         if in_example:
@@ -25,7 +69,7 @@ def process_file(file_handle: TextIO, filename: str) -> None:
                 in_example = False
             else:
                 continue
-                
+
         # Check for start of example section
         stripped = line.rstrip()
         if stripped.endswith('>') and (stripped == '>' or stripped.endswith(' >')):
@@ -47,7 +91,7 @@ def process_file(file_handle: TextIO, filename: str) -> None:
                 continue
 
             tag = line[start+1:end]
-            
+
             # Validate tag - no spaces, tabs, or vertical bars
             if ' ' in tag or '\t' in tag or '|' in tag:
                 pos = start + 1
@@ -56,28 +100,180 @@ def process_file(file_handle: TextIO, filename: str) -> None:
             # Check whitespace before and after tag
             valid_start = start == 0 or line[start-1].isspace()
             valid_end = end + 1 >= len(line) or line[end+1].isspace()
-            
+
             if valid_start and valid_end:
                 # Escape backslashes and forward slashes
                 escaped_tag = tag.replace('\\', '\\\\').replace('/', '\\/')
-                print(f"{tag}\t{filename}\t/*{escaped_tag}*")
+                yield f"{tag}\t{filename}\t/*{escaped_tag}*"
 
             pos = end + 1
 
+def text_newlines(data: bytes) -> bytes:
+    """
+    Return data, the content of a help file, with the line breaks of text
+    mode.
+    """
+    if b'\r' in data:
+        data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    return data
+
+def scan_data(data: bytes, filename: str) -> List[str]:
+    """
+    Return the tags file lines for the tags defined in data, the content of
+    a help file, decoded and with newlines handled as in text mode.
+    """
+    if _doctags is not None:
+        return _doctags.scan_tags(text_newlines(data), filename)
+    if bulkscan is not None and len(data) >= BULK_SCAN_MIN_SIZE:
+        return bulkscan.scan_tags(data, filename)
+    return list(scan_file(io.TextIOWrapper(io.BytesIO(data), encoding='utf-8'), filename))
+
+def process_file(file_handle: TextIO, filename: str) -> None:
+    """
+    Process a single file and generate tags.
+    """
+    for entry in scan_file(file_handle, filename):
+        print(entry)
+
+def report_duplicates(entries: Iterator[str]) -> None:
+    """Report tags defined more than once, like Vim's :helptags does."""
+    seen: Dict[str, str] = {}
+    for entry in entries:
+        tag, filename = entry.split('\t', 2)[:2]
+        if tag in seen:
+            print(f'Duplicate tag "{tag}" in {seen[tag]} and {filename}', file=sys.stderr)
+        else:
+            seen[tag] = filename
+
+def file_stamp(filepath: Path) -> List:
+    """Return the [size, mtime] of a file, as recorded in the state file."""
+    st = filepath.stat()
+    return [st.st_size, st.st_mtime_ns]
+
+def by_language(filepaths: List[Path]) -> Dict[str, List[Path]]:
+    """Group help files by language, in the order of their first file."""
+    languages: Dict[str, List[Path]] = {}
+    for filepath in filepaths:
+        languages.setdefault(help_language(str(filepath)), []).append(filepath)
+    return languages
+
+def update_tags(tagsfile: Path, filepaths: List[Path], language: str = "") -> None:
+    """
+    Bring tagsfile, the tags file of language, up to date for filepaths.
+    Next to it, tagsfile.state records for every source file its size,
+    mtime, SHA-1 and the tags it defines.  Files whose size and mtime are
+    unchanged are trusted, files with a new stamp are hashed, and only
+    files whose hash changed are scanned again.  Lines of the other files
+    are copied from the existing tags file as they are.
+    """
+    statefile = tagsfile.with_name(tagsfile.name + ".state")
+    try:
+        with statefile.open('r', encoding='utf-8') as f:
+            state = json.load(f)
+        with tagsfile.open('r', encoding='utf-8') as f:
+            old_lines = [line.rstrip('\n') for line in f]
+    except (IOError, ValueError):
+        state = {}
+        old_lines = [help_tags_line(language)]
+
+    new_state = {}
+    new_lines = []
+    removed = set(state)
+    changed = set()
+    for filepath in filepaths:
+        name = str(filepath)
+        removed.discard(name)
+        try:
+            stamp = file_stamp(filepath)
+            record = state.get(name)
+            if record is not None and record[:2] == stamp:
+                new_state[name] = record
+                continue
+            data = filepath.read_bytes()
+        except IOError:
+            print(f"Unable to open {filepath} for reading", file=sys.stderr)
+            continue
+
+        digest = hashlib.sha1(data).hexdigest()
+        if record is not None and record[2] == digest:
+            # Touched but not changed
+            new_state[name] = stamp + record[2:]
+            continue
+
+        try:
+            data = decompress(name, data)
+        except DECOMPRESS_ERRORS:
+            print(f"Unable to open {filepath} for reading", file=sys.stderr)
+            continue
+        entries = sorted(scan_data(data, inner_name(name)))
+        new_lines.append(entries)
+        new_state[name] = stamp + [digest, [entry.split('\t', 1)[0] for entry in entries]]
+        changed.add(name)
+
+    if changed or removed:
+        stale = {inner_name(name) for name in changed | removed}
+        kept = [line for line in old_lines if line.split('\t', 2)[1] not in stale]
+        tmpfile = tagsfile.with_name(tagsfile.name + ".tmp")
+        with tmpfile.open('w', encoding='utf-8') as f:
+            for line in heapq.merge(kept, *new_lines):
+                f.write(line + '\n')
+        os.replace(tmpfile, tagsfile)
+        print(f"{tagsfile}: rescanned {len(changed)} files, dropped {len(removed)}",
+              file=sys.stderr)
+
+    tmpfile = statefile.with_name(statefile.name + ".tmp")
+    with tmpfile.open('w', encoding='utf-8') as f:
+        json.dump(new_state, f, separators=(',', ':'))
+    os.replace(tmpfile, statefile)
+
+    report_duplicates(f"{tag}\t{inner_name(name)}" for name, record in new_state.items() for tag in record[3])
+
+def write_tags(out: TextIO, help_tags: str, filepaths: Iterator[Path]) -> None:
+    """Write the help_tags line and the tags of filepaths, in file order."""
+    print(help_tags, file=out)
+
+    for filepath in filepaths:
+        try:
+            with open_binary(str(filepath)) as f:
+                data = f.read()
+        except DECOMPRESS_ERRORS:
+            print(f"Unable to open {filepath} for reading", file=sys.stderr)
+            continue
+        for entry in scan_data(data, inner_name(str(filepath))):
+            print(entry, file=out)
+
 def main() -> None:
     """Process command line arguments and handle file operations."""
-    if len(sys.argv) <= 1:
-        print("Usage: doctags docfile ... >tags", file=sys.stderr)
-        sys.exit(1)
+    parser = argparse.ArgumentParser(prog="doctags", usage="doctags docfile ... >tags\n"
+                                     "       doctags -d dir docfile ...\n"
+                                     "       doctags -u tags docfile ...")
+    parser.add_argument("docfiles", nargs="+", metavar="docfile")
+    parser.add_argument("-d", "--tags-dir", metavar="DIR",
+                        help="write the tags of every language into DIR/tags, DIR/tags-xy, ...")
+    parser.add_argument("-u", "--update", metavar="TAGS",
+                        help="update the sorted tags file TAGS, and TAGS-xy for other languages, "
+                        "rescanning only changed files")
+    args = parser.parse_args()
+    if args.update and args.tags_dir:
+        parser.error("-d can't be combined with -u")
 
-    print("help-tags\ttags\t1")
-    
-    for filepath in map(Path, sys.argv[1:]):
+    if args.update:
+        for language, filepaths in by_language([Path(name) for name in args.docfiles]).items():
+            update_tags(Path(tags_name(args.update, language)), filepaths, language)
+        return
+
+    if not args.tags_dir:
+        write_tags(sys.stdout, HELP_TAGS_LINE, map(Path, args.docfiles))
+        return
+
+    for language, filepaths in by_language([Path(name) for name in args.docfiles]).items():
+        tagsfile = os.path.join(args.tags_dir, tags_name("tags", language))
         try:
-            with filepath.open('r', encoding='utf-8') as f:
-                process_file(f, str(filepath))
+            with open(tagsfile, 'w', encoding='utf-8') as f:
+                write_tags(f, help_tags_line(language), filepaths)
         except IOError as e:
-            print(f"Unable to open {filepath} for reading", file=sys.stderr)
+            print(f"Unable to write {tagsfile}: {e}", file=sys.stderr)
+            sys.exit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
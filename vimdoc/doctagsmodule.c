@@ -0,0 +1,333 @@
+/* vim:set ts=4 sw=4:
+ *
+ * _doctags: the tag scan of doctags.c as a Python extension, for doctags.py.
+ *
+ * scan_tags(data, filename) returns the tags file lines for the tags defined
+ * in data, the bytes of a help file with its line breaks turned into "\n" by
+ * the caller.  Bad UTF-8 raises UnicodeDecodeError, as reading the file as
+ * text does.
+ *
+ * The star pair search, the tag character check and the escaping are those
+ * of doctags.c.  The line rules are those of doctags.scan_file(), so that
+ * both give the same result:
+ * - lines have no length limit,
+ * - white space is what str.isspace() accepts, including non-ASCII spaces,
+ * - a line ending in ">" or " >" (trailing white space ignored) starts an
+ *   example and defines no tags itself,
+ * - a tag may be followed by any white space.
+ *
+ * Build with the CMakeLists.txt next to this file.
+ */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <stdint.h>
+#include <string.h>
+
+#define HIGH_BITS 0x8080808080808080ULL
+
+/*
+ * Whether "p" to "end" is UTF-8 that Python decodes strictly: no overlong
+ * forms, surrogates or characters beyond U+10FFFF.
+ */
+	static int
+utf8_valid(const unsigned char *p, const unsigned char *end)
+{
+	uint64_t	word;
+	int			len;
+	int			i;
+
+	while (p < end)
+	{
+		// ASCII eight bytes at a time
+		while (end - p >= 8)
+		{
+			memcpy(&word, p, 8);
+			if (word & HIGH_BITS)
+				break;
+			p += 8;
+		}
+		if (p == end)
+			break;
+		if (*p < 0x80)
+		{
+			++p;
+			continue;
+		}
+		if (*p < 0xC2 || *p > 0xF4)
+			return 0;
+		len = *p < 0xE0 ? 2 : *p < 0xF0 ? 3 : 4;
+		if (end - p < len)
+			return 0;
+		for (i = 1; i < len; ++i)
+			if ((p[i] & 0xC0) != 0x80)
+				return 0;
+		if ((*p == 0xE0 && p[1] < 0xA0) || (*p == 0xED && p[1] > 0x9F)
+				|| (*p == 0xF0 && p[1] < 0x90) || (*p == 0xF4 && p[1] > 0x8F))
+			return 0;
+		p += len;
+	}
+	return 1;
+}
+
+/*
+ * Decode the UTF-8 character starting at "p", before "end".  The data has
+ * been checked by utf8_valid() already.
+ */
+	static Py_UCS4
+decode_char(const unsigned char *p, const unsigned char *end)
+{
+	Py_UCS4	c = *p;
+	int		len;
+	int		i;
+
+	if (c < 0x80)
+		return c;
+	if (c >= 0xF0)
+	{
+		c &= 0x07;
+		len = 4;
+	}
+	else if (c >= 0xE0)
+	{
+		c &= 0x0F;
+		len = 3;
+	}
+	else
+	{
+		c &= 0x1F;
+		len = 2;
+	}
+	for (i = 1; i < len && p + i < end; ++i)
+		c = (c << 6) | (p[i] & 0x3F);
+	return c;
+}
+
+/*
+ * Start of the UTF-8 character ending just before "p", not before "start".
+ */
+	static const unsigned char *
+char_start(const unsigned char *start, const unsigned char *p)
+{
+	--p;
+	while (p > start && (*p & 0xC0) == 0x80)
+		--p;
+	return p;
+}
+
+/*
+ * Whether the character starting at "p" is white space.
+ */
+	static int
+space_at(const unsigned char *p, const unsigned char *end)
+{
+	return Py_UNICODE_ISSPACE(decode_char(p, end));
+}
+
+/*
+ * Whether the line "line" to "end", with its newline, starts an example:
+ * without trailing white space it is ">" or ends in " >".
+ */
+	static int
+starts_example(const unsigned char *line, const unsigned char *end)
+{
+	const unsigned char	*p = end;
+	const unsigned char	*c;
+
+	while (p > line)
+	{
+		c = char_start(line, p);
+		if (!space_at(c, end))
+			break;
+		p = c;
+	}
+	if (p == line || p[-1] != '>')
+		return 0;
+	return p - 1 == line || p[-2] == ' ';
+}
+
+/*
+ * Append the tags file line for the tag "tag" to "tag_end" in "filename"
+ * to "result".  Returns -1 on error.
+ */
+	static int
+add_tag(PyObject *result, const unsigned char *tag, const unsigned char *tag_end,
+		const char *filename, Py_ssize_t filename_len)
+{
+	Py_ssize_t	tag_len = tag_end - tag;
+	char		*buf;
+	char		*q;
+	const unsigned char	*p;
+	PyObject	*entry;
+	int			ret;
+
+	// tag, tab, filename, tab, "/*", escaped tag, "*"
+	buf = PyMem_Malloc(tag_len * 3 + filename_len + 5);
+	if (buf == NULL)
+	{
+		PyErr_NoMemory();
+		return -1;
+	}
+	q = buf;
+	memcpy(q, tag, tag_len);
+	q += tag_len;
+	*q++ = '\t';
+	memcpy(q, filename, filename_len);
+	q += filename_len;
+	*q++ = '\t';
+	*q++ = '/';
+	*q++ = '*';
+	for (p = tag; p < tag_end; ++p)
+	{
+		// insert backslash before '\\' and '/'
+		if (*p == '\\' || *p == '/')
+			*q++ = '\\';
+		*q++ = *p;
+	}
+	*q++ = '*';
+
+	entry = PyUnicode_DecodeUTF8(buf, q - buf, "strict");
+	PyMem_Free(buf);
+	if (entry == NULL)
+		return -1;
+	ret = PyList_Append(result, entry);
+	Py_DECREF(entry);
+	return ret;
+}
+
+/*
+ * Add the tags defined in the line "line" to "end" to "result".
+ * Returns -1 on error.
+ */
+	static int
+scan_line(PyObject *result, const unsigned char *line, const unsigned char *end,
+		const char *filename, Py_ssize_t filename_len)
+{
+	const unsigned char	*p1, *p2;
+	const unsigned char	*p;
+
+	p1 = memchr(line, '*', end - line);				// find first '*'
+	while (p1 != NULL)
+	{
+		p2 = memchr(p1 + 1, '*', end - p1 - 1);		// find second '*'
+		if (p2 == NULL)
+			break;
+		if (p2 == p1 + 1)							// skip "**"
+		{
+			p1 = p2;
+			continue;
+		}
+		for (p = p1 + 1; p < p2; ++p)
+			if (*p == ' ' || *p == '\t' || *p == '|')
+				break;
+		if (p != p2)
+		{
+			p1 = p2;
+			continue;
+		}
+		// Only accept a *tag* when there is white space before it and it
+		// is followed by white space or the end of the file.
+		if ((p1 == line || space_at(char_start(line, p1), end))
+				&& (p2 + 1 >= end || space_at(p2 + 1, end))
+				&& add_tag(result, p1 + 1, p2, filename, filename_len) < 0)
+			return -1;
+		if (p2 + 1 >= end)
+			break;
+		p1 = memchr(p2 + 1, '*', end - p2 - 1);		// find next '*'
+	}
+	return 0;
+}
+
+	static PyObject *
+scan_tags(PyObject *self, PyObject *args)
+{
+	Py_buffer	data;
+	PyObject	*filename_obj;
+	const char	*filename;
+	Py_ssize_t	filename_len;
+	PyObject	*result;
+	const unsigned char	*line;
+	const unsigned char	*next;
+	const unsigned char	*end;
+	int			in_example = 0;
+
+	(void)self;
+	if (!PyArg_ParseTuple(args, "y*U:scan_tags", &data, &filename_obj))
+		return NULL;
+	filename = PyUnicode_AsUTF8AndSize(filename_obj, &filename_len);
+	result = filename == NULL ? NULL : PyList_New(0);
+	if (result == NULL)
+	{
+		PyBuffer_Release(&data);
+		return NULL;
+	}
+
+	line = data.buf;
+	end = line + data.len;
+	if (!utf8_valid(line, end))
+	{
+		// Let Python raise the error reading the file as text would
+		PyObject *text = PyUnicode_DecodeUTF8(data.buf, data.len, "strict");
+
+		if (text == NULL)
+			Py_CLEAR(result);
+		Py_XDECREF(text);
+		if (result == NULL)
+		{
+			PyBuffer_Release(&data);
+			return NULL;
+		}
+	}
+	for (; line < end; line = next)
+	{
+		next = memchr(line, '\n', end - line);
+		next = next == NULL ? end : next + 1;
+
+		if (in_example)
+		{
+			// skip over example; non-blank in first column ends example
+			if (space_at(line, next))
+				continue;
+			in_example = 0;
+		}
+		if (starts_example(line, next))
+		{
+			in_example = 1;
+			continue;
+		}
+		if (scan_line(result, line, next, filename, filename_len) < 0)
+		{
+			Py_CLEAR(result);
+			break;
+		}
+	}
+
+	PyBuffer_Release(&data);
+	return result;
+}
+
+static PyMethodDef doctags_methods[] = {
+	{"scan_tags", scan_tags, METH_VARARGS,
+		"scan_tags(data, filename)\n\n"
+		"The tags file lines for the tags defined in data, the UTF-8 bytes of a\n"
+		"help file with \"\\n\" line breaks, like doctags.scan_file() yields them."},
+	{NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef doctags_module = {
+	PyModuleDef_HEAD_INIT,
+	"_doctags",
+	"Tag scan of doctags.c for doctags.py.",
+	-1,
+	doctags_methods,
+	NULL,	// m_slots
+	NULL,	// m_traverse
+	NULL,	// m_clear
+	NULL	// m_free
+};
+
+	PyMODINIT_FUNC
+PyInit__doctags(void)
+{
+	return PyModule_Create(&doctags_module);
+}
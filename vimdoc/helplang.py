@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+# languages of help files
+#
+# English help files are named foo.txt and listed in "tags".  Translations
+# are named foo.xyx, xy being the language (foo.jax, foo.cnx, ...), and each
+# language has its own "tags-xy", as Vim's :helptags writes them.
+
+import os
+import re
+
+from compressed import inner_name
+
+# The .xyx extension of a translated help file
+TRANSLATED_RE = re.compile(r'\.([a-zA-Z]{2})x$')
+
+def help_language(name):
+    """
+    The language of the help file name, "" for English.  A compressed file
+    is named by the file inside it.
+    """
+    name = inner_name(name)
+    match = TRANSLATED_RE.search(name)
+    if match is None or name.lower().endswith('.txt'):
+        return ""
+    return match.group(1).lower()
+
+def page_name(name):
+    """
+    The name of the help file name without directory, compression suffix
+    and .txt or .xyx extension.
+    """
+    base = os.path.basename(inner_name(name))
+    if base.endswith('.txt') or help_language(base):
+        base = base[:-4]
+    return base
+
+def tags_name(tagfile, language):
+    """
+    The tags file of language next to tagfile, the English one.
+    """
+    if not language:
+        return tagfile
+    return f"{tagfile}-{language}"
+
+def help_tags_line(language):
+    """
+    The help-tags entry :helptags puts at the top of the tags file of
+    language.
+    """
+    return f"help-tags\t{tags_name('tags', language)}\t1"
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+# checkpoint journal for resuming an interrupted vim2html.py run
+#
+# The journal is a file of JSON lines, one appended and synced to disk for
+# every converted input.  A line records the input, a key hashing the input
+# with everything else that shapes the output, the SHA-1 of every file
+# written for it, and what the run collected from it besides the pages.
+# A line cut short by a kill is ignored; for an input recorded more than
+# once, the last line counts.
+
+import hashlib
+import json
+import os
+import threading
+
+def text_digest(text):
+    """
+    SHA-1 of text as it is written out, in UTF-8.
+    """
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+class Journal:
+    """
+    The journal in path, opened for appending.  record() may be called
+    from several threads at once.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        try:
+            with open(path, 'rb') as journal_f:
+                data = journal_f.read()
+        except FileNotFoundError:
+            data = b""
+        complete = data[:data.rfind(b'\n') + 1]
+        for line in complete.splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            self.entries[entry["input"]] = entry
+        if len(complete) != len(data):
+            # Drop the line cut short, or the next record would be appended
+            # to it and be lost as well
+            os.truncate(path, len(complete))
+        self.journal_f = open(path, 'a', encoding='utf-8')
+        self.lock = threading.Lock()
+
+    def completed(self, infile, key, directory="."):
+        """
+        The entry recording infile as converted with key, or None if it
+        has to be converted (again).  Outputs that are missing or differ
+        from what was written then count as not converted.
+        """
+        entry = self.entries.get(infile)
+        if entry is None or entry["key"] != key:
+            return None
+        for name, digest in entry["outputs"].items():
+            try:
+                with open(os.path.join(directory, name), 'r', encoding='utf-8', newline='') as out_f:
+                    if text_digest(out_f.read()) != digest:
+                        return None
+            except (IOError, ValueError):
+                return None
+        return entry
+
+    def record(self, infile, key, outputs, **collected):
+        """
+        Records infile as converted with key into the files outputs, a
+        dict mapping names to the text_digest() of their content.
+        collected is stored with it for completed() to hand back.
+        """
+        entry = dict(collected, input=infile, key=key, outputs=outputs)
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + "\n"
+        with self.lock:
+            self.journal_f.write(line)
+            self.journal_f.flush()
+            self.entries[infile] = entry
+        os.fsync(self.journal_f.fileno())
+
+    def close(self):
+        self.journal_f.close()
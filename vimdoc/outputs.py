@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+# where vim2html.py puts the files it generates
+#
+# An output takes whole files by name: write(name, text) and, when all
+# files are written, close().
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import tarfile
+import tempfile
+import time
+import zipfile
+
+# Name of the offset index appended to archives
+ARCHIVE_INDEX = "vim2html-index.json"
+# Zip member dates can't be older than 1980-01-01
+ZIP_EPOCH = 315532800
+
+class DirectoryOutput:
+    """
+    Writes every file into a directory, the current one by default.
+    Files are replaced atomically, and files that already have the same
+    content are left alone, keeping their modification time.
+    """
+    def __init__(self, directory="."):
+        self.directory = directory
+        # Temporary files are created private, the final files get the
+        # permissions open() would have given them
+        umask = os.umask(0)
+        os.umask(umask)
+        self.mode = 0o666 & ~umask
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        if self.unchanged(path, text.encode('utf-8')):
+            return
+        if os.path.dirname(name):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Through a temporary file and a rename, so that an interrupted run
+        # leaves either the old file or the new one, never half of one
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(name)}.", suffix=".tmp",
+                                        dir=os.path.dirname(path))
+        try:
+            with open(fd, 'w', encoding='utf-8') as out_f:
+                out_f.write(text)
+            os.chmod(tmp_path, self.mode)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def unchanged(path, data):
+        """
+        Whether the file path exists with data as its content.
+        """
+        try:
+            if os.stat(path).st_size != len(data):
+                return False
+            digest = hashlib.sha256()
+            with open(path, 'rb') as in_f:
+                for block in iter(lambda: in_f.read(1 << 16), b''):
+                    digest.update(block)
+        except OSError:
+            return False
+        return digest.digest() == hashlib.sha256(data).digest()
+
+    def close(self):
+        pass
+
+class ArchiveOutput:
+    """
+    Streams every file into a single .zip or .tar archive instead of
+    creating loose files.  The kind of archive follows the file name:
+    .zip (deflated), .tar, or .tar.gz/.tgz, .tar.bz2, .tar.xz.
+
+    For .zip and plain .tar archives, the last member is ARCHIVE_INDEX,
+    a JSON object mapping each member name to the byte offset and length of
+    its data inside the archive, so a server can answer a request with one
+    seek and read.  Zip entries are raw deflate streams ("method": 8).
+
+    Members are dated now, or mtime, seconds since 1970, when given: the
+    same files then make the same archive, byte for byte, in any time
+    zone.
+    """
+    def __init__(self, path, mtime=None):
+        self.path = path
+        self.index = {}
+        if mtime is None:
+            self.mtime = time.time()
+            self.date_time = time.localtime(self.mtime)[:6]
+        else:
+            self.mtime = mtime
+            self.date_time = time.gmtime(max(mtime, ZIP_EPOCH))[:6]
+        self.gzip = None
+        lower = path.lower()
+        if lower.endswith('.zip'):
+            self.zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED)
+            self.tar = None
+        else:
+            mode = 'w'
+            for suffixes, compressed in (((".tar.gz", ".tgz"), 'w:gz'),
+                                         ((".tar.bz2",), 'w:bz2'),
+                                         ((".tar.xz",), 'w:xz')):
+                if lower.endswith(suffixes):
+                    mode = compressed
+            self.zip = None
+            if mode == 'w:gz':
+                # The gzip header carries a date of its own
+                self.gzip = gzip.GzipFile(path, 'wb', mtime=int(self.mtime))
+                self.tar = tarfile.open(fileobj=self.gzip, mode='w')
+            else:
+                self.tar = tarfile.open(path, mode)
+            # Offsets into a compressed tar are of no use to a server
+            self.index = {} if mode == 'w' else None
+
+    def write(self, name, text):
+        data = text.encode('utf-8')
+        if self.zip is not None:
+            info = zipfile.ZipInfo(name, self.date_time)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            self.zip.writestr(info, data)
+            # Local file header: 30 fixed bytes, then name and extra field
+            offset = info.header_offset + 30 + len(info.filename.encode('utf-8')) + len(info.extra)
+            self.index[name] = {"offset": offset, "length": info.compress_size,
+                                "size": info.file_size, "method": info.compress_type}
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(self.mtime)
+            info.mode = 0o644
+            self.tar.addfile(info, io.BytesIO(data))
+            if self.index is not None:
+                # The data is the last thing written, padded to whole blocks
+                blocks = (info.size + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE
+                offset = self.tar.offset - blocks * tarfile.BLOCKSIZE
+                self.index[name] = {"offset": offset, "length": info.size,
+                                    "size": info.size, "method": 0}
+
+    def close(self):
+        if self.index:
+            self.write(ARCHIVE_INDEX, json.dumps(self.index, separators=(',', ':')))
+        if self.zip is not None:
+            self.zip.close()
+        else:
+            self.tar.close()
+            if self.gzip is not None:
+                self.gzip.close()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+# the Vim help syntax rules shared by all rendering strategies
+#
+# vim2html.py and the strategies in strategies.py decide differently where
+# examples start and end or how a line is laid out, but they escape text,
+# split lines into tokens and highlight text the same way, with the
+# compiled patterns and functions here.
+
+import io
+import re
+
+# Highlight rules that are plain regexes; none of them can backtrack
+CTRL_RE = re.compile(r'CTRL-(\w+)')
+PARAM_RE = re.compile(r'\[(range|line|count|offset|cmd|[-+]?num)\]')
+NOTE_RE = re.compile(r'(Note:?)', re.IGNORECASE)
+# A line of only - or = is a separator
+SEPARATOR_RE = re.compile(r"^\s*[-=]+\s*$")
+# |link| and *tag* tokens
+TOKEN_RE = re.compile(r'(\|[^\|]+\||\*[^\*]+\*)')
+# Opening tags of the highlight spans, by the class names of the stylesheet
+MARKUP = {
+    'keystroke': '<code class="keystroke">',
+    'special': '<code class="special">',
+    'note': '<code class="note">',
+    'section': '<code class="section">',
+    'example': '<code class="example">',
+    'badlink': '<code class="badlink">',
+}
+
+def esctext(text):
+    """
+    Escapes special characters in text for HTML display.
+    Corresponds to Perl's esctext sub.
+    """
+    text = text.replace('&', '&amp;')
+    text = text.replace('<', '&lt;')
+    text = text.replace('>', '&gt;')
+    return text
+
+def escurl(url_str):
+    """
+    Escapes special characters in a string for use in a URL fragment (anchor name).
+    Corresponds to Perl's escurl sub.
+    """
+    url_str = url_str.replace('"', '%22')
+    url_str = url_str.replace('~', '%7E')
+    url_str = url_str.replace('<', '%3C')
+    url_str = url_str.replace('>', '%3E')
+    url_str = url_str.replace('=', '%20') # As per original Perl script
+    url_str = url_str.replace('#', '%23')
+    url_str = url_str.replace('/', '%2F')
+    return url_str
+
+def wrap_delimited(text, opening, closing, code_tag):
+    """
+    Wraps every opening...closing span of text in code_tag and </code>,
+    ending each span at the first closing after its opening.
+    Same result as re.sub(opening + '(.*?)' + closing, ...), but in linear
+    time: the regex rescans the rest of the line from every unmatched
+    opening, this stops at the first opening without a closing after it.
+    """
+    out = []
+    pos = 0
+    while True:
+        start = text.find(opening, pos)
+        if start < 0:
+            break
+        end = text.find(closing, start + len(opening))
+        if end < 0:
+            break
+        end += len(closing)
+        out.append(text[pos:start])
+        out.append(f'{code_tag}{text[start:end]}</code>')
+        pos = end
+    if not out:
+        return text
+    out.append(text[pos:])
+    return "".join(out)
+
+def highlight_spans(text, markup=MARKUP):
+    """
+    Applies the keystroke, parameter and note highlights to escaped text.
+    The local heading rule is left to the caller, the strategies differ
+    in it.
+    """
+    text = CTRL_RE.sub(markup['keystroke'] + r'CTRL-\1</code>', text)
+    # parameter <...>
+    text = wrap_delimited(text, '&lt;', '&gt;', markup['special'])
+    # parameter {...}
+    text = wrap_delimited(text, '{', '}', markup['special'])
+    # parameter [...]
+    text = PARAM_RE.sub(markup['special'] + r'[\1]</code>', text)
+    # note
+    text = NOTE_RE.sub(markup['note'] + r'\1</code>', text)
+    return text
+
+def text_lines(data):
+    """
+    The lines of data, the bytes of a help file, with the same decoding
+    and newline handling as reading the file in text mode.
+    """
+    return io.TextIOWrapper(io.BytesIO(data), encoding='utf-8', errors='ignore')
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+# content-addressed store for the files vim2html.py generates
+#
+# Every file is kept once, as a blob named after the SHA-256 of its content
+# in objects/xx/ of the store, no matter how many builds contain it.  A
+# build is a manifest, a JSON object whose "files" map the names of its
+# files to their hashes.  materialize() makes the directory of a build out
+# of hard links to the blobs, so identical pages of different builds share
+# their disk space too.
+#
+# Usage: store.py <store dir> <manifest> <directory>
+#   materializes the build of manifest into directory
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+# Hash naming the blobs, recorded in the manifests
+HASH_NAME = "sha256"
+
+def blob_path(store_dir, digest):
+    """
+    Path of the blob with hex digest in store_dir.
+    """
+    return os.path.join(store_dir, "objects", digest[:2], digest[2:])
+
+def write_temporary(path, write):
+    """
+    Creates a temporary file next to path, filled by write(), and returns
+    its name, for renaming it over path: path is then either missing or
+    complete.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp",
+                                    dir=os.path.dirname(path))
+    try:
+        with open(fd, 'wb') as out_f:
+            write(out_f)
+        return tmp_path
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+class StoreOutput:
+    """
+    Writes every file as a blob into the store store_dir, skipping blobs it
+    already has, and the manifest of the build into manifest_path on
+    close().  Blobs are read-only, as they are shared by builds.
+    """
+    def __init__(self, store_dir, manifest_path):
+        self.store_dir = store_dir
+        self.manifest_path = manifest_path
+        self.files = {}
+        umask = os.umask(0)
+        os.umask(umask)
+        self.mode = 0o444 & ~umask
+        self.manifest_mode = 0o666 & ~umask
+
+    def write(self, name, text):
+        data = text.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = blob_path(self.store_dir, digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = write_temporary(path, lambda out_f: out_f.write(data))
+            os.chmod(tmp_path, self.mode)
+            os.replace(tmp_path, path)
+        self.files[name] = digest
+
+    def close(self):
+        manifest = {"hash": HASH_NAME, "files": dict(sorted(self.files.items()))}
+        path = os.path.abspath(self.manifest_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = write_temporary(
+            path, lambda out_f: out_f.write(json.dumps(manifest, indent=1).encode('utf-8') + b"\n"))
+        os.chmod(tmp_path, self.manifest_mode)
+        os.replace(tmp_path, path)
+
+def materialize(store_dir, manifest_path, directory):
+    """
+    Makes every file of the manifest in manifest_path a hard link to its
+    blob in store_dir, under directory.  Files already linked are left
+    alone; where hard links are impossible, as across file systems, the
+    blob is copied.  Returns the number of files linked and copied.
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as manifest_f:
+        manifest = json.load(manifest_f)
+    if manifest.get("hash") != HASH_NAME:
+        raise ValueError(f"{manifest_path} is not a {HASH_NAME} manifest")
+
+    linked = copied = 0
+    for name, digest in manifest["files"].items():
+        blob = blob_path(store_dir, digest)
+        path = os.path.join(directory, name)
+        try:
+            if os.path.samefile(blob, path):
+                continue
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Link next to the file and rename over it, so that readers see
+        # the old file or the new one
+        tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}.tmp")
+        try:
+            os.link(blob, tmp_path)
+            linked += 1
+        except OSError:
+            shutil.copyfile(blob, tmp_path)
+            copied += 1
+        os.replace(tmp_path, path)
+    return linked, copied
+
+def main():
+    if len(sys.argv) != 4:
+        print("Usage: store.py <store dir> <manifest> <directory>", file=sys.stderr)
+        sys.exit(1)
+    store_dir, manifest_path, directory = sys.argv[1:]
+    try:
+        linked, copied = materialize(store_dir, manifest_path, directory)
+    except (IOError, ValueError, KeyError) as e:
+        print(f"Couldn't materialize {manifest_path}: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"{directory}: {linked} files linked, {copied} copied")
+
+if __name__ == "__main__":
+    main()
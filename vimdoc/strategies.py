@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+# the other ways of rendering a help page, for vim2html.py --strategy
+#
+# vim2html-gemini.py, vim2html-chatgpt.py and vim2html-cursor.py started
+# out as separate translations of vim2html.pl.  Their line handling is kept
+# here, each as one function rendering a whole page, so that they share the
+# tag map and compiled rules of vim2html.py and can be compared with it
+# (see bench_strategies.py).  How they differ from the "reference"
+# vim2html.py rendering:
+#
+#   gemini   streams lines straight to HTML without a token stream, and
+#            highlights text tokens of any length.
+#   chatgpt  like gemini, but the line that ends an example and an example
+#            marker inside an example are not shown as example lines; only
+#            real |link| and *tag* matches are links and tags; the date is
+#            not zero padded.
+#   cursor   collapses runs of blank lines, keeps the indent of a line
+#            (tabs widened), highlights every text part of a line ending
+#            in "~" as a heading, does not end separators with a newline,
+#            and puts the upper case name in the title.
+#
+# Every function takes the page name, its lines as read in text mode, a
+# function mapping a |link| target to HTML and the date as
+# (day, month, year) strings, None for no stamp, and returns the page.
+
+import re
+
+from rules import MARKUP, SEPARATOR_RE, TOKEN_RE, esctext, escurl, highlight_spans
+
+def page_header(title, head):
+    return f"""<!DOCTYPE html PUBLIC "-//W3C//DTD HTML 4.01 Transitional//EN">
+<html>
+<head>
+<title>VIM: {title}</title>
+<link rel="stylesheet" href="vim-stylesheet.css" type="text/css">
+</head>
+<body>
+<h2>{head}</h2>
+<pre>
+"""
+
+def page_footer(date, padded=True):
+    """
+    The end of a page, stamped with date unless it is None.
+    """
+    stamp = ""
+    if date is not None:
+        if not padded:
+            date = map(unpadded, date)
+        stamp = f"<p><i>Generated by vim2html on {'.'.join(date)}</i></p>\n"
+    return f"""</pre>
+{stamp}</body>
+</html>
+"""
+
+def unpadded(number):
+    """
+    number without leading zeros.
+    """
+    return number.lstrip('0') or number
+
+def tag_html(tag):
+    return f'<b class="vimtag">*<a name="{escurl(tag)}">{esctext(tag)}</a>*</b>'
+
+def text_html(text):
+    """
+    A text token with the highlights and the local heading rule.
+    """
+    text = highlight_spans(esctext(text))
+    if text.endswith('~'):
+        text = f'{MARKUP["section"]}{text[:-1]}</code>'
+    return text
+
+def render_gemini(name, lines, maplink, date):
+    out = [page_header(name, name.upper())]
+    inexample = 0
+    for raw_line in lines:
+        line = raw_line.rstrip('\n')
+        current_line = line
+        output_as_example = (inexample == 2)
+
+        if SEPARATOR_RE.match(line):
+            out.append("</pre><hr><pre>\n")
+            continue
+
+        if line == ">" or line.endswith(" >"):
+            current_line = line[:-2] if line.endswith(" >") else ""
+            inexample = 1
+        elif inexample and (line.startswith("<") or (line and not line[0].isspace())):
+            inexample = 0
+            if line.startswith("<"):
+                current_line = line[1:]
+
+        out_parts = []
+        for token in TOKEN_RE.split(current_line.rstrip()):
+            if token.startswith('|') and token.endswith('|') and len(token) > 1:
+                out_parts.append("|" + maplink(token[1:-1]) + "|")
+            elif token.startswith('*') and token.endswith('*') and len(token) > 1:
+                out_parts.append(tag_html(token[1:-1]))
+            else:
+                out_parts.append(text_html(token))
+        line_html = "".join(out_parts)
+
+        if output_as_example:
+            out.append(f'<code class="example">{line_html}</code>\n')
+        else:
+            out.append(f'{line_html}\n')
+
+        if inexample == 1:
+            inexample = 2
+
+    out.append(page_footer(date))
+    return "".join(out)
+
+def render_chatgpt(name, lines, maplink, date):
+    out = [page_header(name, name.upper())]
+    inexample = 0
+    for line in lines:
+        line = line.rstrip('\n')
+        if SEPARATOR_RE.match(line):
+            out.append("</pre><hr><pre>\n")
+            continue
+
+        if line == '>' or line.endswith(' >'):
+            inexample = 1
+            line = line[:-1]
+        elif inexample and line and not line[0].isspace():
+            inexample = 0
+            if line.startswith('<'):
+                line = line[1:]
+
+        tokens = TOKEN_RE.split(line.rstrip())
+        out_parts = []
+        # re.split() puts the matches at the odd positions
+        for i, token in enumerate(tokens):
+            if i % 2 == 0:
+                out_parts.append(text_html(token))
+            elif token[0] == '|':
+                out_parts.append(f"|{maplink(token[1:-1])}|")
+            else:
+                out_parts.append(tag_html(token[1:-1]))
+        line_html = "".join(out_parts)
+
+        if inexample == 2:
+            out.append(f'<code class="example">{line_html}</code>\n')
+        else:
+            out.append(line_html + "\n")
+
+        if inexample == 1:
+            inexample = 2
+
+    out.append(page_footer(date, padded=False))
+    return "".join(out)
+
+def cursor_indent(line):
+    """
+    The leading white space of line, eight spaces per character if it
+    has a tab.
+    """
+    match = re.match(r'^(\s+)', line)
+    if not match:
+        return ''
+    indent = match.group(1)
+    if '\t' in indent:
+        indent = ' ' * (len(indent) * 8)
+    return indent
+
+def cursor_text_html(text, heading, table_head):
+    text = highlight_spans(esctext(text))
+    if heading:
+        stripped = text.rstrip().rstrip('~')
+        if stripped:
+            if table_head:
+                return f'{MARKUP["section"]}{stripped}</code>~'
+            return f'{MARKUP["section"]}{stripped}</code>'
+    return text
+
+def render_cursor(name, lines, maplink, date):
+    head = name.upper()
+    out = [page_header(head, head)]
+    in_example = 0
+    prev_line_empty = False
+    for original_line in lines:
+        line = original_line.rstrip()
+
+        if SEPARATOR_RE.match(line):
+            out.append('</pre><hr><pre>' if prev_line_empty else '\n</pre><hr><pre>')
+            prev_line_empty = False
+            continue
+
+        if line.endswith('>'):
+            if line == '>' or line.endswith(' >'):
+                in_example = 1
+                line = line[:-1]
+        elif in_example and line and not line[0].isspace():
+            in_example = 0
+            if line.startswith('<'):
+                line = line[1:]
+
+        # Every text part of a line ending in "~" is a heading; the header
+        # of the table in help.txt keeps its "~"
+        heading = original_line.rstrip().endswith('~')
+        table_head = heading and all(word in original_line for word in ('WHAT', 'PREPEND', 'EXAMPLE'))
+        out_parts = []
+        pos = 0
+        for match in TOKEN_RE.finditer(line):
+            if match.start() > pos:
+                out_parts.append(cursor_text_html(line[pos:match.start()], heading, table_head))
+            token = match.group(1)
+            if token.startswith('|'):
+                out_parts.append(f"|{maplink(token[1:-1])}|")
+            else:
+                out_parts.append(tag_html(token[1:-1]))
+            pos = match.end()
+        if pos < len(line):
+            out_parts.append(cursor_text_html(line[pos:], heading, table_head))
+        line_html = "".join(out_parts)
+
+        if line_html.strip():
+            line_html = cursor_indent(original_line) + line_html.lstrip()
+        else:
+            # Runs of blank lines become one
+            if not prev_line_empty:
+                out.append('\n')
+                prev_line_empty = True
+            continue
+
+        if in_example == 2:
+            out.append(f'<code class="example">{line_html}</code>\n')
+        else:
+            out.append(f'{line_html}\n')
+        prev_line_empty = False
+
+        if in_example == 1:
+            in_example = 2
+
+    out.append(page_footer(date, padded=False))
+    return "".join(out)
+
+# Strategy name -> page rendering function
+STRATEGIES = {
+    'gemini': render_gemini,
+    'chatgpt': render_chatgpt,
+    'cursor': render_cursor,
+}
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+# near-miss suggestions for unknown help tags
+#
+# Tags are indexed by their padded bigrams.  Two strings within edit distance
+# k share at least max(len) + 1 - 2k bigrams, so a query only has to verify
+# the tags whose bigram overlap reaches that count; the verification itself
+# is a banded Levenshtein that gives up as soon as the distance exceeds k.
+
+from collections import defaultdict
+
+PAD = '\0'
+
+def bigrams(word):
+    """
+    Returns the bigrams of word padded on both sides, with repetitions.
+    """
+    padded = PAD + word + PAD
+    return [padded[i:i + 2] for i in range(len(padded) - 1)]
+
+def edit_distance(a, b, limit):
+    """
+    Levenshtein distance between a and b, or limit + 1 once it is known to
+    exceed limit.  Only the diagonal band of width 2 * limit + 1 is computed.
+    """
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if len(a) - len(b) > limit:
+        return limit + 1
+
+    over = limit + 1
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        ca = a[i - 1]
+        low = max(1, i - limit)
+        high = min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= limit else over
+        best = current[0]
+        for j in range(low, high + 1):
+            cost = previous[j - 1] + (ca != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            if cost > over:
+                cost = over
+            current[j] = cost
+            if cost < best:
+                best = cost
+        if best > limit:
+            return over
+        previous = current
+    return previous[-1]
+
+def suggestion_distance(tag):
+    """
+    How many edits we allow before a suggestion stops being useful.
+    Short tags would match half the tag set at distance 2.
+    """
+    if len(tag) <= 3:
+        return 1
+    return 2
+
+class TagIndex:
+    """
+    Bigram index over a set of tag names for edit-distance search.
+    """
+    def __init__(self, tags=()):
+        self.tags = []
+        self.postings = defaultdict(list)
+        self.by_length = defaultdict(list)
+        for tag in tags:
+            self.add(tag)
+
+    def add(self, tag):
+        tag_id = len(self.tags)
+        self.tags.append(tag)
+        self.by_length[len(tag)].append(tag_id)
+        for gram in set(bigrams(tag)):
+            self.postings[gram].append(tag_id)
+
+    def candidates(self, word, max_dist):
+        """
+        Ids of the tags that pass the bigram count filter for word.
+        """
+        grams = set(bigrams(word))
+        # Each edit destroys at most two bigrams.  Shared counts are taken
+        # over distinct bigrams, so be conservative by the repeats in word.
+        need = len(grams) - 2 * max_dist
+        if need <= 0:
+            # Too short for the filter to say anything: fall back to the
+            # tags of a compatible length.
+            ids = []
+            for length in range(len(word) - max_dist, len(word) + max_dist + 1):
+                ids.extend(self.by_length.get(length, ()))
+            return ids
+
+        counts = defaultdict(int)
+        for gram in grams:
+            for tag_id in self.postings.get(gram, ()):
+                counts[tag_id] += 1
+        return [tag_id for tag_id, count in counts.items() if count >= need]
+
+    def search(self, word, max_dist):
+        """
+        Returns a list of (distance, tag) for every tag within max_dist of
+        word, closest first.
+        """
+        found = []
+        for tag_id in self.candidates(word, max_dist):
+            tag = self.tags[tag_id]
+            dist = edit_distance(word, tag, max_dist)
+            if dist <= max_dist:
+                found.append((dist, tag))
+        found.sort()
+        return found
+
+    def suggest(self, tag, limit=5):
+        """
+        Returns up to limit tag names close to tag, closest first.
+        """
+        return [word for dist, word in self.search(tag, suggestion_distance(tag))[:limit]]
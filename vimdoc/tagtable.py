@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+# frozen, read-only tag table for sharing between processes
+#
+# The table is the flat equivalent of a hashtab_T from hashtab/libhashtab.h
+# with HTFLAGS_FROZEN set: it is built once, written to a file and then only
+# looked up.  Every process maps the same file read-only, so the pages are
+# shared by the OS instead of each worker holding its own dict of tags.
+#
+# Layout, all integers little endian:
+#   header   magic "VTAG", version, mask, used
+#   slots    mask + 1 entries of hash, key offset, key length,
+#            value offset, value length; key length 0 is an empty slot
+#   strings  UTF-8 keys and values, offsets are relative to the file start
+#
+# Hashing and probing follow hash_hash() and hash_lookup() in libhashtab.c,
+# so a C reader can use the same file.
+
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+
+MAGIC = b'VTAG'
+VERSION = 1
+HEADER = struct.Struct('<4sIQQ')
+SLOT = struct.Struct('<QIIII')
+
+# Same as in libhashtab.c / libhashtab.h
+HT_INIT_SIZE = 16
+PERTURB_SHIFT = 5
+HASH_MASK = (1 << 64) - 1
+
+def hash_hash(key):
+    """
+    Vim's hash_hash() on the UTF-8 bytes of key, with the signed char and
+    64-bit unsigned long arithmetic of libhashtab.c on x86-64.
+    """
+    hash_val = 0
+    for c in key:
+        if c >= 0x80:
+            c -= 0x100
+        hash_val = (hash_val * 101 + c) & HASH_MASK
+    return hash_val
+
+def table_size(used):
+    """
+    Number of slots hash_may_resize() would pick for used items.
+    """
+    minsize = used * 3 // 2 + 1
+    size = HT_INIT_SIZE
+    while size < minsize:
+        size <<= 1
+    return size
+
+def probe(hash_val, mask):
+    """
+    Yields the slot indexes hash_lookup() visits for hash_val.
+    """
+    idx = hash_val & 0xFFFFFFFF
+    yield idx & mask
+    perturb = hash_val
+    while True:
+        idx = ((idx << 2) + idx + perturb + 1) & 0xFFFFFFFF
+        yield idx & mask
+        perturb >>= PERTURB_SHIFT
+
+def pack(mapping):
+    """
+    Returns the frozen table for a str -> str mapping as bytes.
+    """
+    items = [(key.encode('utf-8'), value.encode('utf-8')) for key, value in mapping.items()]
+    size = table_size(len(items))
+    mask = size - 1
+
+    strings_start = HEADER.size + size * SLOT.size
+    strings = bytearray()
+    slots = [None] * size
+    for key, value in items:
+        hash_val = hash_hash(key)
+        for idx in probe(hash_val, mask):
+            if slots[idx] is None:
+                break
+        key_off = strings_start + len(strings)
+        strings += key
+        val_off = strings_start + len(strings)
+        strings += value
+        slots[idx] = (hash_val, key_off, len(key), val_off, len(value))
+
+    out = bytearray(HEADER.pack(MAGIC, VERSION, mask, len(items)))
+    empty = SLOT.pack(0, 0, 0, 0, 0)
+    for slot in slots:
+        out += empty if slot is None else SLOT.pack(*slot)
+    out += strings
+    return bytes(out)
+
+def write_table(path, mapping):
+    """
+    Writes the frozen table for mapping to path.
+    """
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as table_f:
+        table_f.write(pack(mapping))
+    os.replace(tmp_path, path)
+
+class FrozenTagTable(Mapping):
+    """
+    Read-only str -> str mapping over a frozen table in a buffer.
+    """
+    def __init__(self, buf):
+        self.buf = buf
+        magic, version, self.mask, self.used = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a frozen tag table")
+
+    @classmethod
+    def open(cls, path):
+        """
+        Maps the table file at path read-only.
+        """
+        with open(path, 'rb') as table_f:
+            buf = mmap.mmap(table_f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buf)
+
+    def _slot(self, idx):
+        return SLOT.unpack_from(self.buf, HEADER.size + idx * SLOT.size)
+
+    def _find(self, key):
+        key = key.encode('utf-8')
+        hash_val = hash_hash(key)
+        buf = self.buf
+        for idx in probe(hash_val, self.mask):
+            slot_hash, key_off, key_len, val_off, val_len = self._slot(idx)
+            if key_len == 0:
+                return None
+            if slot_hash == hash_val and buf[key_off:key_off + key_len] == key:
+                return buf[val_off:val_off + val_len].decode('utf-8')
+
+    def __getitem__(self, key):
+        value = self._find(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self._find(key) is not None
+
+    def __len__(self):
+        return self.used
+
+    def __iter__(self):
+        buf = self.buf
+        for idx in range(self.mask + 1):
+            slot_hash, key_off, key_len, val_off, val_len = self._slot(idx)
+            if key_len:
+                yield buf[key_off:key_off + key_len].decode('utf-8')
@@ -9,35 +9,140 @@ import re
 import sys
 import os
 import datetime
+import argparse
+import asyncio
+import concurrent.futures
+import hashlib
+import io
+import json
+import marshal
+import mmap
+import multiprocessing
+import tempfile
+import zlib
+from collections import ChainMap
+from collections.abc import Mapping
 
-# Global variable, equivalent to Perl's %url
+from compressed import DECOMPRESS_ERRORS, decompress, inner_name, open_binary
+from helplang import help_language, page_name, tags_name
+from journal import Journal, text_digest
+from outputs import ArchiveOutput, DirectoryOutput
+from rules import MARKUP, SEPARATOR_RE, TOKEN_RE, esctext, escurl, highlight_spans, text_lines
+from store import StoreOutput
+from strategies import STRATEGIES
+from tagsuggest import TagIndex
+from tagtable import FrozenTagTable, write_table
+
+# Global variable, equivalent to Perl's %url; a ChainMap of the tag
+# layers when more than one tag file is read, see load_tag_layers()
 url_map = {}
+# Where generated files go, see outputs.py
+output = DirectoryOutput()
+# Unknown link targets seen while converting, tag -> pages that use it
+bad_links = {}
+# Tag preview snippets collected while converting, tag -> [page, HTML]
+snippets = {}
+# How pages are rendered: "reference" or one of strategies.STRATEGIES
+strategy = "reference"
 # Global variables for date, equivalent to Perl's $date related logic
-# Populated at the start of the script execution
+# Populated at the start of the script execution, left empty for pages
+# without the "Generated by" stamp
 current_day = ""
 current_month = ""
 current_year = ""
 
-def maplink(tag):
+# Line kinds of the parsed token stream
+LINE_TEXT = 0
+LINE_EXAMPLE = 1
+LINE_RULE = 2
+# Token kinds of the parsed token stream
+TOK_TEXT = 0
+TOK_LINK = 1
+TOK_TAG = 2
+# Text tokens longer than this are escaped but not highlighted; far beyond
+# anything written by hand, it only guards against generated help files
+MAX_HIGHLIGHT_LENGTH = 65536
+# Short class names used by the compact HTML output and its stylesheet
+COMPACT_CLASS_NAMES = {
+    'vimtag': 't',
+    'keystroke': 'k',
+    'special': 's',
+    'note': 'n',
+    'section': 'h',
+    'example': 'e',
+    'badlink': 'x',
+}
+COMPACT_MARKUP = {name: f'<code class={short}>' for name, short in COMPACT_CLASS_NAMES.items()}
+CODE_TAG_RE = re.compile(r'<code class=(\w+)>|</code>')
+# The line index records where every LINE_INDEX_STEP-th line starts
+LINE_INDEX_STEP = 32
+# A tag preview snippet is the line defining the tag and the ones after it,
+# up to SNIPPET_LINES lines in all
+SNIPPET_LINES = 4
+# Snippet shards are named after the first SNIPPET_SHARD_CHARS hex digits of
+# the SHA-1 of the tag
+SNIPPET_SHARD_CHARS = 2
+# Bump whenever parse_lines() output changes, cached token streams are
+# keyed on it
+TOKEN_STREAM_VERSION = 1
+# Bump whenever parse_tag_file() output changes, cached tag maps are keyed
+# on it
+TAG_MAP_VERSION = 1
+
+class ConversionError(Exception):
+    """
+    A file that can't be read or written; the message says which and why.
+    """
+
+class RenderState:
+    """
+    What rendering one help file reads and collects: the tag map and the
+    stamp date, (day, month, year) strings or None for no stamp, and the
+    bad links and snippets found.  Converter makes a fresh one for every
+    file, so renders running at the same time write to nothing shared.
+    """
+    def __init__(self, tags, date=None, found=None, found_snippets=None):
+        self.tags = tags
+        self.date = date
+        self.bad_links = {} if found is None else found
+        self.snippets = {} if found_snippets is None else found_snippets
+
+def global_state():
+    """
+    A RenderState over the module globals, for the functions called
+    without one: it collects into bad_links and snippets.
+    """
+    date = (current_day, current_month, current_year) if current_year else None
+    return RenderState(url_map, date, bad_links, snippets)
+
+def maplink(tag, page=None, markup=MARKUP, state=None):
     """
     Resolves a Vim tag to an HTML link or marks it as a bad link.
     Corresponds to Perl's maplink sub.
+    Bad links are remembered in the bad links of state, global_state() by
+    default, together with the page they were found on, for the broken
+    link report.
     """
-    if tag in url_map:
-        return url_map[tag]
+    if state is None:
+        state = global_state()
+    tags = state.tags
+    if tag in tags:
+        return tags[tag]
     else:
         # warn "Unknown hyperlink target: $tag\n"; (Perl comment)
+        pages = state.bad_links.setdefault(tag, [])
+        if page is not None and page not in pages:
+            pages.append(page)
         tag = tag.replace('.txt', '')
         tag = tag.replace('<', '&lt;')
         tag = tag.replace('>', '&gt;')
-        return f'<code class="badlink">{tag}</code>'
+        return f'{markup["badlink"]}{tag}</code>'
 
-def read_tag_file(tagfile):
+def parse_tag_file(tagfile):
     """
-    Reads a Vim tags file and populates the global url_map.
-    Corresponds to Perl's readTagFile sub.
+    Reads a Vim tags file and returns its tags mapped to their links.
     """
-    global url_map
+    tags = {}
     try:
         with open(tagfile, 'r', encoding='utf-8', errors='ignore') as tags_f:
             for line in tags_f:
@@ -49,198 +154,1130 @@ def read_tag_file(tagfile):
                 file_path = match.group(2)
                 label = tag
 
-                file_path = file_path.replace('.txt', '.html')
+                if help_language(file_path):
+                    file_path = file_path[:-4] + '.html'
+                else:
+                    file_path = file_path.replace('.txt', '.html')
                 label = label.replace('.txt', '')
 
-                url_map[tag] = f'<a href="{file_path}#{escurl(tag)}">{esctext(label)}</a>'
+                tags[tag] = f'<a href="{file_path}#{escurl(tag)}">{esctext(label)}</a>'
     except FileNotFoundError:
-        print(f"Error: Can't read tags file '{tagfile}'", file=sys.stderr)
-        sys.exit(1)
+        raise ConversionError(f"Error: Can't read tags file '{tagfile}'")
     except Exception as e:
-        print(f"Error reading tags file '{tagfile}': {e}", file=sys.stderr)
-        sys.exit(1)
+        raise ConversionError(f"Error reading tags file '{tagfile}': {e}")
+    return tags
 
-def esctext(text):
+def read_tag_file(tagfile):
+    """
+    Reads a Vim tags file and populates the global url_map.
+    Corresponds to Perl's readTagFile sub.
+    """
+    url_map.update(parse_tag_file(tagfile))
+
+def load_base_tags(tagfile, cache_dir=None):
+    """
+    Returns the tags of tagfile mapped to their links.
+    With a cache_dir, the mapping is kept there as compressed marshal data
+    named after the hash of the tag file, like the token streams of
+    parse_data(), and loaded from it while the tag file is unchanged.
+    """
+    if not cache_dir:
+        return parse_tag_file(tagfile)
+    try:
+        with open(tagfile, 'rb') as tags_f:
+            key = hashlib.sha1(b'%d\0' % TAG_MAP_VERSION + tags_f.read()).hexdigest()
+    except IOError:
+        # parse_tag_file() reports it
+        return parse_tag_file(tagfile)
+    cache_file = os.path.join(cache_dir, f"{key}.tags")
+    try:
+        with open(cache_file, 'rb') as cache_f:
+            return marshal.loads(zlib.decompress(cache_f.read()))
+    except (IOError, ValueError, EOFError, TypeError, zlib.error):
+        pass
+
+    tags = parse_tag_file(tagfile)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_file, 'wb') as cache_f:
+            cache_f.write(zlib.compress(marshal.dumps(tags)))
+    except IOError as e:
+        print(f"Couldn't write to {cache_file}: {e}", file=sys.stderr)
+    return tags
+
+def layer_tags(base, layer_files):
     """
-    Escapes special characters in text for HTML display.
-    Corresponds to Perl's esctext sub.
+    The tags of layer_files over the tag map base: a tag is looked up in
+    layer_files in order, then in base.  base is shared as it is, never
+    copied.
     """
-    text = text.replace('&', '&amp;')
-    text = text.replace('<', '&lt;')
-    text = text.replace('>', '&gt;')
-    return text
+    if not layer_files:
+        return base
+    return ChainMap(*(parse_tag_file(layer_file) for layer_file in layer_files), base)
 
-def escurl(url_str):
+def load_tag_layers(tagfile, layer_files=(), cache_dir=None):
     """
-    Escapes special characters in a string for use in a URL fragment (anchor name).
-    Corresponds to Perl's escurl sub.
+    Sets url_map to the tags of tagfile, the base layer, under the tags of
+    layer_files, see layer_tags(), and returns the base layer.  It comes
+    from cache_dir if it was read before (see load_base_tags()), so plugin
+    tag files can go on top of the runtime tags at little cost.
     """
-    url_str = url_str.replace('"', '%22')
-    url_str = url_str.replace('~', '%7E')
-    url_str = url_str.replace('<', '%3C')
-    url_str = url_str.replace('>', '%3E')
-    url_str = url_str.replace('=', '%20') # As per original Perl script
-    url_str = url_str.replace('#', '%23')
-    url_str = url_str.replace('/', '%2F')
-    return url_str
+    global url_map
+    base = load_base_tags(tagfile, cache_dir)
+    url_map = layer_tags(base, layer_files)
+    return base
 
-def vim2html(infile):
+def plugin_help(directory):
     """
-    Converts a single Vim documentation text file to HTML.
-    Corresponds to Perl's vim2html sub.
+    The tag files and the help files, .txt and .xyx, compressed or not, of
+    the plugin help directory directory.  Its tags are in "tags", where
+    :helptags writes them; without it, the plugin has no tag files and
+    resolves links in the base layer only.
     """
-    global current_day, current_month, current_year
     try:
-        with open(infile, 'r', encoding='utf-8', errors='ignore') as in_f:
-            base_outfile_name = os.path.basename(infile)
-            base_outfile_name = re.sub(r'\.txt$', '', base_outfile_name)
-            
-            outfile_html = f"{base_outfile_name}.html"
+        names = sorted(name for name in os.listdir(directory)
+                       if inner_name(name).endswith('.txt') or help_language(name))
+    except IOError as e:
+        raise ConversionError(f"Couldn't read plugin help directory {directory}: {e}")
+    tagfile = os.path.join(directory, "tags")
+    layer_files = [tagfile]
+    if not os.path.exists(tagfile):
+        print(f"No tags in {directory}, its links resolve to <tag file> only", file=sys.stderr)
+        layer_files = []
+    return layer_files, [os.path.join(directory, name) for name in names]
+
+def load_language_tags(tagfiles, language):
+    """
+    Returns the tags of language out of the tags-xy files next to
+    tagfiles, looked up in the order of tagfiles, and the names of the
+    files read.  Without any, the language resolves links to English only.
+    """
+    layers = []
+    found = []
+    for tagfile in tagfiles:
+        language_file = tags_name(tagfile, language)
+        if os.path.exists(language_file):
+            layers.append(parse_tag_file(language_file))
+            found.append(language_file)
+    if not layers:
+        print(f"No {tags_name('tags', language)} next to {' '.join(tagfiles)}, "
+              f"{language} links resolve to English pages only", file=sys.stderr)
+    return ChainMap(*layers), found
+
+class RelativeTags(Mapping):
+    """
+    The tag map tags as seen from a page one directory down, as the pages
+    of a translation are: every link points into the parent directory.
+    Links are rewritten on lookup, tags itself is shared, not copied.
+    """
+    def __init__(self, tags):
+        self.tags = tags
+
+    def __getitem__(self, tag):
+        return self.tags[tag].replace('<a href="', '<a href="../', 1)
+
+    def __contains__(self, tag):
+        return tag in self.tags
+
+    def __iter__(self):
+        return iter(self.tags)
+
+    def __len__(self):
+        return len(self.tags)
+
+def parse_lines(lines, inexample=0):
+    """
+    Parses the lines of a Vim help file into a token stream, one entry per
+    line.  Every entry is a tuple: a LINE_* kind, followed by alternating
+    TOK_* kinds and token texts for LINE_TEXT and LINE_EXAMPLE lines.
+    All Vim help syntax decisions are made here; the emitters only decide
+    how each token looks.
+    inexample is the example state to start in, for parsing from the
+    middle of a file.
+    """
+    doc = []
+    # inexample 0: not in example, 1: marker found, next line is example, 2: in example content
+
+    for raw_line in lines:
+        line = raw_line.rstrip('\n') # Equivalent to Perl's chop for newline
+        current_line_for_processing = line
+
+        # Determine if the current line's output should be wrapped in <code class="example">
+        # This depends on the state *before* processing the current line's markers
+        output_as_example = (inexample == 2)
 
-            try:
-                with open(outfile_html, 'w', encoding='utf-8') as out_f:
-                    head = base_outfile_name.upper()
+        if SEPARATOR_RE.match(line):
+            doc.append((LINE_RULE,))
+            continue
 
-                    out_f.write(f"""<!DOCTYPE html PUBLIC "-//W3C//DTD HTML 4.01 Transitional//EN">
+        # Handle example markers and state transitions
+        if line == ">" or line.endswith(" >"):
+            if line.endswith(" >"):
+                current_line_for_processing = line[:-2]
+            else: # line == ">"
+                current_line_for_processing = ""
+            inexample = 1 # Signal that the *next* line starts example content
+        elif inexample and (line.startswith("<") or (line and not line[0].isspace())):
+            # This line terminates an example block
+            inexample = 0
+            if line.startswith("<"):
+                current_line_for_processing = line[1:]
+            # else current_line_for_processing remains as `line`
+        # If no marker logic hit, inexample (0 or 2) carries over,
+        # and current_line_for_processing is the original `line`.
+
+        current_line_for_processing = current_line_for_processing.rstrip() # s/\s+$//g;
+
+        # Tokenize
+        # Split by recognized patterns, keeping the delimiters
+        # Pattern: (|...|) or (*...*)
+        tokens = TOKEN_RE.split(current_line_for_processing)
+
+        entry = [LINE_EXAMPLE if output_as_example else LINE_TEXT]
+        for token in tokens:
+            if not token:
+                continue
+
+            if token.startswith('|') and token.endswith('|') and len(token) > 1:
+                entry += (TOK_LINK, token[1:-1])
+            elif token.startswith('*') and token.endswith('*') and len(token) > 1:
+                entry += (TOK_TAG, token[1:-1])
+            else:
+                entry += (TOK_TEXT, token)
+        doc.append(tuple(entry))
+
+        # State transition for the *next* iteration
+        if inexample == 1: # Marker was found on current line
+            inexample = 2  # Next line will be example content
+        # If inexample was 0, it stays 0. If it was 2, it stays 2 (unless an end-of-example marker was found this iteration).
+
+    return doc
+
+def read_input(infile):
+    """
+    Returns the content of infile as bytes, decompressed if need be.
+    """
+    try:
+        with open_binary(infile) as in_f:
+            return in_f.read()
+    except FileNotFoundError:
+        raise ConversionError(f"Couldn't read from {infile}: File not found.")
+    except DECOMPRESS_ERRORS as e:
+        raise ConversionError(f"Couldn't read from {infile}: {e}")
+
+def read_file(infile):
+    """
+    Returns the bytes of infile as they are stored, compressed or not.
+    """
+    try:
+        with open(infile, 'rb') as in_f:
+            return in_f.read()
+    except FileNotFoundError:
+        raise ConversionError(f"Couldn't read from {infile}: File not found.")
+    except IOError as e:
+        raise ConversionError(f"Couldn't read from {infile}: {e}")
+
+def decompress_input(infile, raw):
+    """
+    The content of infile, given the bytes raw read from it by read_file(),
+    as read_input() returns it.
+    """
+    try:
+        return decompress(infile, raw)
+    except DECOMPRESS_ERRORS as e:
+        raise ConversionError(f"Couldn't read from {infile}: {e}")
+
+def read_doc(infile, cache_dir=None):
+    """
+    Returns the token stream for infile.
+    """
+    return parse_data(read_input(infile), cache_dir)
+
+def parse_data(data, cache_dir=None):
+    """
+    Returns the token stream for the content of a help file.
+    With a cache_dir, token streams are kept there as compressed marshal
+    data named after the hash of the input, so an unchanged file is parsed
+    only once no matter how many formats are emitted from it.
+    """
+    cache_file = None
+    if cache_dir:
+        key = hashlib.sha1(b'%d\0' % TOKEN_STREAM_VERSION + data).hexdigest()
+        cache_file = os.path.join(cache_dir, f"{key}.tok")
+        try:
+            with open(cache_file, 'rb') as cache_f:
+                return marshal.loads(zlib.decompress(cache_f.read()))
+        except (IOError, ValueError, EOFError, TypeError, zlib.error):
+            pass
+
+    doc = parse_lines(text_lines(data))
+
+    if cache_file:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(cache_file, 'wb') as cache_f:
+                cache_f.write(zlib.compress(marshal.dumps(doc)))
+        except IOError as e:
+            print(f"Couldn't write to {cache_file}: {e}", file=sys.stderr)
+
+    return doc
+
+def build_line_index(data, doc):
+    """
+    Returns the line index of a help file, given its bytes and token stream:
+    "checkpoints" holds [byte offset, example state] of every
+    LINE_INDEX_STEP-th line, "tags" maps each *tag* to [line, byte offset]
+    of the line defining it.  With it, render_lines() can start parsing at
+    the checkpoint before any line instead of at the top of the file.
+    "size" and "sha1" identify the data indexed.
+    Returns None for files with lone CR line breaks, whose text mode lines
+    don't match the lines between LF bytes.
+    """
+    if data.count(b'\r') != data.count(b'\r\n'):
+        return None
+
+    # Example state of each checkpoint line.  A separator line keeps the
+    # state of the line after it, so the states are carried backwards.
+    states = []
+    state = 0
+    for line_num in range(len(doc) - 1, -1, -1):
+        if doc[line_num][0] != LINE_RULE:
+            state = 2 if doc[line_num][0] == LINE_EXAMPLE else 0
+        if line_num % LINE_INDEX_STEP == 0:
+            states.append(state)
+    states.reverse()
+
+    checkpoints = []
+    tags = {}
+    offset = 0
+    for line_num, entry in enumerate(doc):
+        if line_num % LINE_INDEX_STEP == 0:
+            checkpoints.append([offset, states[line_num // LINE_INDEX_STEP]])
+        for i in range(1, len(entry), 2):
+            if entry[i] == TOK_TAG:
+                tags.setdefault(entry[i + 1], [line_num, offset])
+        offset = data.find(b'\n', offset) + 1
+
+    return {"step": LINE_INDEX_STEP, "lines": len(doc),
+            "size": len(data), "sha1": hashlib.sha1(data).hexdigest(),
+            "checkpoints": checkpoints, "tags": tags}
+
+class DocView:
+    """
+    Renders parts of one help file through its line index, reading the
+    file through mmap, with links resolved in the tag map tags.  Loading
+    the index and mapping the file is done once; each render then only
+    parses the lines since the closest checkpoint.  Every render has a
+    RenderState of its own and tags is only read, so many threads can
+    render with one view at once.
+    """
+    def __init__(self, infile, index, tags):
+        self.name = re.sub(r'\.txt$', '', os.path.basename(infile))
+        self.index = index
+        self.tags = tags
+        with open(infile, 'rb') as in_f:
+            self.data = mmap.mmap(in_f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @classmethod
+    def open(cls, infile, index_file, tags):
+        """
+        The view of infile through its line index in index_file, linking
+        with tags.  An index made before infile last changed would render
+        the wrong lines, so it raises ConversionError.
+        """
+        with open(index_file, 'r', encoding='utf-8') as index_f:
+            view = cls(infile, json.load(index_f), tags)
+        if (len(view.data) != view.index.get("size")
+                or hashlib.sha1(view.data).hexdigest() != view.index.get("sha1")):
+            view.data.close()
+            raise ConversionError(f"{index_file} is not the line index of {infile} as it is now")
+        return view
+
+    def render_lines(self, first, last):
+        """
+        HTML for lines first up to but not including last, numbered from 0,
+        the same as they appear in the full page.  The range is clamped to
+        the lines of the file.
+        """
+        first = max(first, 0)
+        last = min(last, self.index["lines"])
+        if first >= last:
+            return ""
+        checkpoint = first // self.index["step"]
+        offset, inexample = self.index["checkpoints"][checkpoint]
+        line_num = checkpoint * self.index["step"]
+
+        lines = []
+        data = self.data
+        while line_num < last:
+            end = data.find(b'\n', offset)
+            end = len(data) if end < 0 else end + 1
+            line = data[offset:end].decode('utf-8', errors='ignore')
+            lines.append(line.replace('\r\n', '\n'))
+            offset = end
+            line_num += 1
+
+        doc = parse_lines(lines, inexample)
+        skip = first - checkpoint * self.index["step"]
+        state = RenderState(self.tags)
+        return "".join(html_line(entry, self.name, state) for entry in doc[skip:])
+
+    def render_tag(self, tag, count=5):
+        """
+        HTML for the line defining tag and the count - 1 lines after it, or
+        None for a tag not defined in this file.
+        """
+        found = self.index["tags"].get(tag)
+        if found is None:
+            return None
+        return self.render_lines(found[0], found[0] + count)
+
+def highlight(text, markup=MARKUP):
+    """
+    Escapes a text token and applies the vim highlights.
+    Every rule runs in time linear in the length of the token.  Tokens
+    longer than MAX_HIGHLIGHT_LENGTH are only escaped.
+    """
+    processed_token = esctext(text)
+    if len(processed_token) > MAX_HIGHLIGHT_LENGTH:
+        return processed_token
+    processed_token = highlight_spans(processed_token, markup)
+    # local heading
+    if processed_token.endswith('~'):
+        processed_token = f'{markup["section"]}{processed_token[:-1]}</code>'
+    return processed_token
+
+def merge_spans(line_html):
+    """
+    Joins <code> spans of the same class that follow each other directly:
+    <code class=s>{a}</code><code class=s>{b}</code> becomes
+    <code class=s>{a}{b}</code>.  Spans may nest, so the class of the span
+    being closed is tracked on a stack.
+    """
+    if '</code><code' not in line_html:
+        return line_html
+    out = []
+    stack = []
+    pos = 0
+    matches = list(CODE_TAG_RE.finditer(line_html))
+    i = 0
+    while i < len(matches):
+        m = matches[i]
+        if m.group(1) is not None:
+            stack.append(m.group(1))
+            i += 1
+            continue
+        following = matches[i + 1] if i + 1 < len(matches) else None
+        if (following is not None and following.start() == m.end()
+                and following.group(1) == stack[-1]):
+            out.append(line_html[pos:m.start()])
+            pos = following.end()
+            i += 2
+            continue
+        stack.pop()
+        i += 1
+    out.append(line_html[pos:])
+    return "".join(out)
+
+def html_attr(value):
+    """
+    An attribute value, quoted only when HTML requires it.
+    """
+    if value and not any(c in value for c in ' \t\n\f\r"\'=<>`'):
+        return value
+    return f'"{value}"'
+
+def html_line(entry, name, state=None):
+    """
+    HTML for one token stream entry of help file name, with its newline.
+    Links resolve through state, global_state() by default.
+    """
+    if entry[0] == LINE_RULE:
+        return "</pre><hr><pre>\n"
+
+    out_parts = []
+    for i in range(1, len(entry), 2):
+        kind, token = entry[i], entry[i + 1]
+        if kind == TOK_LINK:
+            out_parts.append("|" + maplink(token, name, state=state) + "|")
+        elif kind == TOK_TAG:
+            # The Perl output is: *<a name="TAG">TAG</a>*
+            out_parts.append(
+                f'<b class="vimtag">*'
+                f'<a name="{escurl(token)}">{esctext(token)}</a>'
+                f'*</b>'
+            )
+        else:
+            out_parts.append(highlight(token))
+
+    final_line_html = "".join(out_parts)
+
+    if entry[0] == LINE_EXAMPLE:
+        return f'<code class="example">{final_line_html}</code>\n'
+    return f'{final_line_html}\n'
+
+def generated_stamp(date):
+    """
+    The "Generated by vim2html" line ending a page, empty without a date.
+    """
+    if date is None:
+        return ""
+    return f"<p><i>Generated by vim2html on {'.'.join(date)}</i></p>\n"
+
+def emit_html(out_f, name, doc, state=None):
+    """
+    Writes the token stream of help file name as an HTML page, rendered
+    with state, global_state() by default.
+    Corresponds to the output half of Perl's vim2html sub.
+    """
+    if state is None:
+        state = global_state()
+    head = name.upper()
+
+    out_f.write(f"""<!DOCTYPE html PUBLIC "-//W3C//DTD HTML 4.01 Transitional//EN">
 <html>
 <head>
-<title>VIM: {base_outfile_name}</title>
+<title>VIM: {name}</title>
 <link rel="stylesheet" href="vim-stylesheet.css" type="text/css">
 </head>
 <body>
 <h2>{head}</h2>
 <pre>
 """)
-                    inexample = 0 # 0: not in example, 1: marker found, next line is example, 2: in example content
-                    
-                    for line_num, raw_line in enumerate(in_f):
-                        line = raw_line.rstrip('\n') # Equivalent to Perl's chop for newline
-                        current_line_for_processing = line
-
-                        # Determine if the current line's output should be wrapped in <code class="example">
-                        # This depends on the state *before* processing the current line's markers
-                        output_as_example = (inexample == 2)
-
-                        if re.match(r"^\s*[-=]+\s*$", line):
-                            out_f.write("</pre><hr><pre>\n")
-                            continue
-                        
-                        # Handle example markers and state transitions
-                        if line == ">" or line.endswith(" >"):
-                            if line.endswith(" >"):
-                                current_line_for_processing = line[:-2]
-                            else: # line == ">"
-                                current_line_for_processing = ""
-                            inexample = 1 # Signal that the *next* line starts example content
-                        elif inexample and (line.startswith("<") or (line and not line[0].isspace())):
-                            # This line terminates an example block
-                            inexample = 0
-                            if line.startswith("<"):
-                                current_line_for_processing = line[1:]
-                            # else current_line_for_processing remains as `line`
-                        # If no marker logic hit, inexample (0 or 2) carries over,
-                        # and current_line_for_processing is the original `line`.
-                        
-                        current_line_for_processing = current_line_for_processing.rstrip() # s/\s+$//g;
-
-                        # Tokenize and apply vim highlights
-                        # Split by recognized patterns, keeping the delimiters
-                        # Pattern: (|...|) or (*...*)
-                        tokens = re.split(r'(\|[^\|]+\||\*[^\*]+\*)', current_line_for_processing)
-                        
-                        out_parts = []
-                        for token in tokens:
-                            if token is None: # re.split can insert None for non-matching capture groups
-                                continue
-
-                            if token.startswith('|') and token.endswith('|') and len(token) > 1:
-                                tag_content = token[1:-1]
-                                out_parts.append("|" + maplink(tag_content) + "|")
-                            elif token.startswith('*') and token.endswith('*') and len(token) > 1:
-                                tag_content = token[1:-1]
-                                out_parts.append(
-                                    f'<b class="vimtag">*{esctext(tag_content)}<a name="{escurl(tag_content)}"></a>*</b>'
-                                )
-                                # Note: Original Perl script had esctext($1) inside <a> and also for the visible part.
-                                # Modern HTML usually puts content inside <a> for named anchors if they are to be visible identifiers,
-                                # but `name` attribute itself doesn't display. Vim's *tag* syntax is a visible target.
-                                # The Perl code was: <b class="vimtag">\*<a name="escurl($1)">esctext($1)<\/a>\*<\/b>
-                                # Let's adjust to closer match the original's visible output if esctext($1) was the link text
-                                # The original's `esctext($1)` inside `<a>` is the link text.
-                                # For a named anchor, often the content is directly the tag.
-                                # The Perl code made `esctext($1)` the content of the `<a>` tag.
-                                # Let's try to match the visual structure as much as possible.
-                                # The name attribute doesn't need visible content within the <a> for navigation.
-                                # However, the Perl output is: *<a name="TAG">TAG</a>*
-                                # So, let's replicate that.
-                                out_parts[-1] = (
-                                    f'<b class="vimtag">*'
-                                    f'<a name="{escurl(tag_content)}">{esctext(tag_content)}</a>'
-                                    f'*</b>'
-                                )
-
-                            else:
-                                # Process regular text parts
-                                processed_token = esctext(token)
-                                processed_token = re.sub(r'CTRL-(\w+)', r'<code class="keystroke">CTRL-\1</code>', processed_token)
-                                # parameter <...>
-                                processed_token = re.sub(r'&lt;(.*?)&gt;', r'<code class="special">&lt;\1&gt;</code>', processed_token)
-                                # parameter {...}
-                                processed_token = re.sub(r'\{([^}]*)\}', r'<code class="special">{\1}</code>', processed_token)
-                                # parameter [...]
-                                processed_token = re.sub(r'\[(range|line|count|offset|cmd|[-+]?num)\]', r'<code class="special">[\1]</code>', processed_token)
-                                # note
-                                processed_token = re.sub(r'(Note:?)', r'<code class="note">\1</code>', processed_token, flags=re.IGNORECASE)
-                                # local heading
-                                processed_token = re.sub(r'^(.*)\~$', r'<code class="section">\1</code>', processed_token)
-                                out_parts.append(processed_token)
-                        
-                        final_line_html = "".join(out_parts)
-
-                        if output_as_example: # True if inexample was 2 at the start of this iteration
-                            out_f.write(f'<code class="example">{final_line_html}</code>\n')
-                        else:
-                            out_f.write(f'{final_line_html}\n')
-                        
-                        # State transition for the *next* iteration
-                        if inexample == 1: # Marker was found on current line
-                            inexample = 2  # Next line will be example content
-                        # If inexample was 0, it stays 0. If it was 2, it stays 2 (unless an end-of-example marker was found this iteration).
-
-                    out_f.write(f"""</pre>
-<p><i>Generated by vim2html on {current_day}.{current_month}.{current_year}</i></p>
-</body>
+    for entry in doc:
+        out_f.write(html_line(entry, name, state))
+
+    out_f.write(f"""</pre>
+{generated_stamp(state.date)}</body>
 </html>
 """)
-            except IOError as e:
-                print(f"Couldn't write to {outfile_html}: {e}", file=sys.stderr)
-                sys.exit(1)
 
-    except FileNotFoundError:
-        print(f"Couldn't read from {infile}: File not found.", file=sys.stderr)
-        sys.exit(1)
+def compact_link(link_html, page=None):
+    """
+    Shortens a link from url_map for the compact output: the href loses
+    its quotes where HTML allows, and links into page itself, if given,
+    keep only the fragment.
+    """
+    if not link_html.startswith('<a href="'):
+        return link_html
+    end = link_html.index('">', 9)
+    href = link_html[9:end]
+    if page is not None and href.startswith(page) and href.startswith(f"{page}.html#"):
+        href = href[len(page) + 5:]
+    return f'<a href={html_attr(href)}>{link_html[end + 2:]}'
+
+def compact_line(entry, name, state, local_links=True):
+    """
+    Compact HTML for one LINE_TEXT or LINE_EXAMPLE entry of help file name,
+    without the example span and newline.  With local_links, links into
+    the page itself keep only the fragment, for lines shown on that page.
+    """
+    markup = COMPACT_MARKUP
+    tag_class = COMPACT_CLASS_NAMES['vimtag']
+    page = name if local_links else None
+    out_parts = []
+    for i in range(1, len(entry), 2):
+        kind, token = entry[i], entry[i + 1]
+        if kind == TOK_LINK:
+            out_parts.append("|" + compact_link(maplink(token, name, markup, state), page) + "|")
+        elif kind == TOK_TAG:
+            out_parts.append(f'<b class={tag_class} id={html_attr(escurl(token))}>*{esctext(token)}*</b>')
+        else:
+            out_parts.append(highlight(token, markup))
+    return merge_spans("".join(out_parts))
+
+def emit_compact_html(out_f, name, doc, state=None):
+    """
+    Writes the token stream of help file name as an HTML page with as
+    little markup as possible: an HTML5 skeleton without optional tags,
+    the short COMPACT_CLASS_NAMES, tags marked by an id instead of an extra
+    <a name> element, shortened links, directly adjacent spans of the same
+    class merged, and runs of example lines in a single span.
+    """
+    if state is None:
+        state = global_state()
+    markup = COMPACT_MARKUP
+    out_f.write(f"""<!DOCTYPE html><meta charset=utf-8><title>VIM: {name}</title>
+<link rel=stylesheet href=vim-stylesheet.css>
+<h2>{name.upper()}</h2>
+<pre>
+""")
+    in_example = False
+    for entry in doc:
+        if in_example and entry[0] != LINE_EXAMPLE:
+            out_f.write('</code>\n')
+            in_example = False
+
+        if entry[0] == LINE_RULE:
+            out_f.write("</pre><hr><pre>\n")
+            continue
+
+        final_line_html = compact_line(entry, name, state)
+
+        # Example lines up to the next other line share one span
+        if entry[0] != LINE_EXAMPLE:
+            out_f.write(f'{final_line_html}\n')
+        elif in_example:
+            out_f.write(f'\n{final_line_html}')
+        else:
+            out_f.write(f'{markup["example"]}{final_line_html}')
+            in_example = True
+
+    if in_example:
+        out_f.write('</code>\n')
+    out_f.write(f"""</pre>
+{generated_stamp(state.date)}""")
+
+def emit_json(out_f, name, doc, state=None):
+    """
+    Writes the token stream of help file name as JSON: one object per line,
+    {"rule": true} for separators, otherwise the example flag and a list of
+    [kind, text] tokens.  Links carry the target page when the tag is known.
+    """
+    if state is None:
+        state = global_state()
+    lines = []
+    for entry in doc:
+        if entry[0] == LINE_RULE:
+            lines.append({"rule": True})
+            continue
+        tokens = []
+        for i in range(1, len(entry), 2):
+            kind, token = entry[i], entry[i + 1]
+            if kind == TOK_LINK:
+                target = state.tags.get(token)
+                if target is None:
+                    maplink(token, name, state=state)
+                    tokens.append(["link", token])
+                else:
+                    tokens.append(["link", token, re.match(r'<a href="([^"#]*)', target).group(1)])
+            elif kind == TOK_TAG:
+                tokens.append(["tag", token])
+            else:
+                tokens.append(["text", token])
+        lines.append({"example": entry[0] == LINE_EXAMPLE, "tokens": tokens})
+    json.dump({"name": name, "lines": lines}, out_f, ensure_ascii=False, separators=(',', ':'))
+    out_f.write("\n")
+
+# Output formats: name -> (file extension, emitter)
+EMITTERS = {
+    'html': ('.html', emit_html),
+    'json': ('.json', emit_json),
+    'compact': ('.html', emit_compact_html),
+}
+
+def snippet_line(entry, name, state, compact=False):
+    """
+    HTML for one line of a snippet of help file name: the markup of
+    html_line(), or with compact that of the compact output, whose
+    stylesheet only knows the short class names.  Snippets are shown on
+    other pages, so links keep the page they point into.
+    """
+    if not compact:
+        return html_line(entry, name, state)
+    line_html = compact_line(entry, name, state, local_links=False)
+    if entry[0] == LINE_EXAMPLE:
+        return f'{COMPACT_MARKUP["example"]}{line_html}</code>\n'
+    return f'{line_html}\n'
+
+def collect_snippets(name, doc, state=None, compact=False):
+    """
+    Adds the preview snippet of every tag defined in doc, the token stream
+    of help file name, to the snippets of state, global_state() by default.
+    With compact, snippets use the markup of the compact output.
+    A snippet ends early at a separator line; a tag defined in several
+    files keeps its first snippet.
+    """
+    if state is None:
+        state = global_state()
+    snippets = state.snippets
+    rendered = {}
+    for line_num, entry in enumerate(doc):
+        for i in range(1, len(entry), 2):
+            if entry[i] != TOK_TAG or entry[i + 1] in snippets:
+                continue
+            parts = []
+            for following in range(line_num, min(line_num + SNIPPET_LINES, len(doc))):
+                if doc[following][0] == LINE_RULE:
+                    break
+                if following not in rendered:
+                    rendered[following] = snippet_line(doc[following], name, state, compact)
+                parts.append(rendered[following])
+            snippets[entry[i + 1]] = [name, "".join(parts)]
+
+def snippet_shard(tag):
+    """
+    Name of the snippet shard holding tag, without the .json extension.
+    """
+    return hashlib.sha1(tag.encode('utf-8')).hexdigest()[:SNIPPET_SHARD_CHARS]
+
+def write_snippets(directory):
+    """
+    Writes snippets into directory as shard files <shard>.json, each a JSON
+    object mapping its tags to [page, HTML].  A client computes
+    snippet_shard() of a tag and loads that one small file.  The HTML is
+    the content of a <pre> block, like the lines of the page itself.
+    """
+    shards = {}
+    for tag, snippet in snippets.items():
+        shards.setdefault(snippet_shard(tag), {})[tag] = snippet
+    try:
+        os.makedirs(directory, exist_ok=True)
+        for shard, shard_snippets in sorted(shards.items()):
+            with open(os.path.join(directory, f"{shard}.json"), 'w', encoding='utf-8') as shard_f:
+                json.dump(shard_snippets, shard_f, ensure_ascii=False, separators=(',', ':'),
+                          sort_keys=True)
     except IOError as e:
-        print(f"Couldn't read from {infile}: {e}", file=sys.stderr)
-        sys.exit(1)
+        raise ConversionError(f"Couldn't write snippets to {directory}: {e}")
 
+def write_files(files, output):
+    """
+    Writes files, a dict mapping names to texts, through output.
+    Returns the names mapped to the text_digest() of the texts.
+    """
+    written = {}
+    for outfile, text in files.items():
+        try:
+            output.write(outfile, text)
+        except IOError as e:
+            raise ConversionError(f"Couldn't write to {outfile}: {e}")
+        written[outfile] = text_digest(text)
+    return written
 
-def usage():
+class Converter:
     """
-    Prints usage message and exits.
-    Corresponds to Perl's usage sub.
+    Converts help files with settings fixed when it is made: the tag map,
+    the strategy, the stamp date ((day, month, year) strings, or None for
+    no stamp), what is written besides the EMITTERS formats and the tag
+    maps of translations, language -> map, see render().  The
+    settings are never changed and the tag map is only read, and every
+    call renders into a RenderState of its own, so many threads can
+    convert with one converter at once.  Calls return the bad links and
+    snippets they found instead of collecting them; merge them in file
+    order to get the result of a sequential run.
+    Errors raise ConversionError.
     """
-    print("""vim2html.py: converts vim documentation to HTML.
-usage:
+    def __init__(self, tags, strategy="reference", date=None, formats=('html',), cache_dir=None,
+                 line_index=False, with_snippets=False, languages=None):
+        settings = {"tags": tags, "strategy": strategy, "date": date, "formats": tuple(formats),
+                    "cache_dir": cache_dir, "line_index": line_index, "with_snippets": with_snippets,
+                    "languages": {} if languages is None else languages}
+        for name, value in settings.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("converter settings can't be changed")
 
-    vim2html.py <tag file> <text files...>""", file=sys.stderr)
-    sys.exit(1)
+    def render(self, infile, data):
+        """
+        Renders data, the content of infile, and returns the bad links and
+        snippets found and the files to write for it, a dict mapping names
+        to texts.  See vim2html().
+        A strategy other than "reference" only renders the HTML page.
+        The files of a translation, foo.xyx, go into the directory xy and
+        resolve links in the tags of language xy first, then in the English
+        ones; snippets are only collected from English help.
+        """
+        base_outfile_name = page_name(infile)
+        language = help_language(infile)
+        if language:
+            tags = ChainMap(self.languages.get(language, {}), RelativeTags(self.tags))
+            state = RenderState(tags, self.date)
+            found, _, files = self.render_files(infile, data, base_outfile_name, state, False)
+            # Pages are named by their path in reports
+            found = {tag: [f"{language}/{page}" for page in pages] for tag, pages in found.items()}
+            return found, {}, {f"{language}/{name}": text for name, text in files.items()}
+        state = RenderState(self.tags, self.date)
+        return self.render_files(infile, data, base_outfile_name, state, self.with_snippets)
 
-def write_css():
+    def render_files(self, infile, data, base_outfile_name, state, with_snippets):
+        """
+        render() for the page base_outfile_name with state.
+        """
+        if self.strategy != "reference":
+            render_page = STRATEGIES[self.strategy]
+            page = render_page(base_outfile_name, text_lines(data),
+                               lambda tag: maplink(tag, base_outfile_name, state=state), self.date)
+            return state.bad_links, state.snippets, {f"{base_outfile_name}.html": page}
+
+        doc = parse_data(data, self.cache_dir)
+        files = {}
+
+        if self.line_index and inner_name(infile) == infile:
+            index = build_line_index(data, doc)
+            if index is not None:
+                files[f"{base_outfile_name}.lidx"] = json.dumps(index, separators=(',', ':'))
+
+        if with_snippets:
+            collect_snippets(base_outfile_name, doc, state, "compact" in self.formats)
+
+        for fmt in self.formats:
+            extension, emitter = EMITTERS[fmt]
+            out_f = io.StringIO()
+            emitter(out_f, base_outfile_name, doc, state)
+            files[f"{base_outfile_name}{extension}"] = out_f.getvalue()
+
+        return state.bad_links, state.snippets, files
+
+    def convert(self, infile, output):
+        """
+        Reads, renders and writes infile through output.  Returns the bad
+        links and snippets found and the names of the files written, mapped
+        to the text_digest() of their content.
+        """
+        found, found_snippets, files = self.render(infile, read_input(infile))
+        return found, found_snippets, write_files(files, output)
+
+def global_converter(formats=('html',), cache_dir=None, line_index=False, with_snippets=False,
+                     languages=None):
     """
-    Writes the CSS stylesheet file.
-    Corresponds to Perl's writeCSS sub.
+    A Converter with the settings in the module globals.
+    """
+    return Converter(url_map, strategy, global_state().date, formats, cache_dir, line_index,
+                     with_snippets, languages)
+
+def render(infile, data, formats=('html',), cache_dir=None, line_index=False, with_snippets=False):
+    """
+    Renders data, the content of infile, with global_converter() and
+    returns the files to write for it: a dict mapping names to texts.
+    The bad links and snippets found are added to the collected ones.
+    """
+    found, found_snippets, files = global_converter(formats, cache_dir, line_index,
+                                                    with_snippets).render(infile, data)
+    merge_found(found, found_snippets)
+    return files
+
+def vim2html(infile, formats=('html',), cache_dir=None, line_index=False, with_snippets=False):
+    """
+    Converts a single Vim documentation text file to HTML, and to any other
+    of the EMITTERS formats asked for.  A compressed file (foo.txt.gz) is
+    decompressed while reading and named after the file inside it.
+    With line_index, the line index of an uncompressed file is written to
+    a .lidx file for DocView.  With with_snippets, the preview snippets of
+    its tags are added to snippets.
+    Returns the names of the files written, mapped to the text_digest() of
+    their content.
+    Corresponds to Perl's vim2html sub.
+    """
+    return write_files(render(infile, read_input(infile), formats, cache_dir, line_index,
+                              with_snippets), output)
+
+def merge_found(found, found_snippets):
+    """
+    Adds the bad links and snippets of one file to the collected ones.
+    Called in file order, the first file defining a tag keeps its snippet
+    like in a plain sequential run.
+    """
+    for tag, pages in found.items():
+        known = bad_links.setdefault(tag, [])
+        known += [page for page in pages if page not in known]
+    for tag, snippet in found_snippets.items():
+        snippets.setdefault(tag, snippet)
+
+def run_key(tagfiles, converter):
+    """
+    Hash of everything other than an input file that decides what is
+    written for it: the converter settings and the tag files.  The date is
+    left out, only whether pages are stamped with one counts.
+    """
+    key = hashlib.sha1(json.dumps([TOKEN_STREAM_VERSION, converter.formats, converter.line_index,
+                                   converter.with_snippets, converter.strategy,
+                                   converter.date is not None,
+                                   sorted(converter.languages)]).encode('utf-8'))
+    for tagfile in tagfiles:
+        try:
+            with open(tagfile, 'rb') as tags_f:
+                key.update(hashlib.sha1(tags_f.read()).digest())
+        except IOError as e:
+            raise ConversionError(f"Error reading tags file '{tagfile}': {e}")
+    return key.hexdigest()
+
+def journal_key(key, raw):
+    """
+    The journal key of an input file whose bytes are raw, in a run with
+    run_key() key.
+    """
+    file_key = hashlib.sha1(key.encode('utf-8'))
+    file_key.update(raw)
+    return file_key.hexdigest()
+
+def journal_lookup(journal, key, file_arg):
+    """
+    Returns the journal key of file_arg for a run with run_key() key and
+    its journal entry if it needs no converting, else None.
+    A file that can't be read gets no key; converting it reports why.
+    """
+    try:
+        with open(file_arg, 'rb') as in_f:
+            file_key = journal_key(key, in_f.read())
+    except IOError:
+        return None, None
+    return file_key, journal.completed(file_arg, file_key, output.directory)
+
+def convert_files(groups, journal=None):
+    """
+    Converts the files of groups one after the other.  groups is a list of
+    (converter, text_files, key): files converted with the same converter,
+    whose settings and tag files give the run_key() key.  With a journal,
+    files it records as converted with the same key are skipped and every
+    file converted is recorded in it.
+    """
+    for converter, text_files, key in groups:
+        for file_arg in text_files:
+            file_key = None
+            if journal is not None:
+                file_key, entry = journal_lookup(journal, key, file_arg)
+                if entry is not None:
+                    print(f"Skipping {file_arg}, converted before.")
+                    merge_found(entry["bad_links"], entry["snippets"])
+                    continue
+            print(f"Processing {file_arg}...")
+            found, found_snippets, written = converter.convert(file_arg, output)
+            merge_found(found, found_snippets)
+            if journal is not None:
+                journal.record(file_arg, file_key, written, bad_links=found, snippets=found_snippets)
+
+async def convert_async(groups, limit, journal=None):
+    """
+    Converts the files of groups, see convert_files(), with asyncio, for
+    many small files where opening, reading and writing take longer than
+    rendering.  Reads and writes run in a pool of limit threads, with up to
+    limit files of any group in flight; each file is rendered in the event
+    loop as soon as it is read.  Bad links and snippets are merged in file
+    order at the end, so they come out as in a sequential run.  A journal
+    is used like convert_files() does; every file is read once for its
+    journal key and its content, and the journal is looked up and synced
+    to disk in the pool too, so that a slow file system holds up only the
+    file concerned.
+    """
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(limit))
+    in_flight = asyncio.Semaphore(limit)
+
+    async def convert(converter, file_arg, key):
+        async with in_flight:
+            raw = await asyncio.to_thread(read_file, file_arg)
+            file_key = None
+            if journal is not None:
+                file_key = journal_key(key, raw)
+                entry = await asyncio.to_thread(journal.completed, file_arg, file_key,
+                                                output.directory)
+                if entry is not None:
+                    print(f"Skipping {file_arg}, converted before.")
+                    return entry["bad_links"], entry["snippets"]
+            data = decompress_input(file_arg, raw)
+            print(f"Processing {file_arg}...")
+            found, found_snippets, files = converter.render(file_arg, data)
+            written = await asyncio.to_thread(write_files, files, output)
+            if journal is not None:
+                await asyncio.to_thread(journal.record, file_arg, file_key, written,
+                                        bad_links=found, snippets=found_snippets)
+            return found, found_snippets
+
+    conversions = [convert(converter, file_arg, key)
+                   for converter, text_files, key in groups for file_arg in text_files]
+    for found, found_snippets in await asyncio.gather(*conversions):
+        merge_found(found, found_snippets)
+
+def freeze_tags(tags, table_dir, tables):
+    """
+    Freezes the tag map tags into table files in table_dir, one per map of
+    a ChainMap, and returns their paths in lookup order.  tables maps the
+    id() of every map frozen before to its table, so that a map shared by
+    several tag maps, like the base layer, is frozen once.
     """
-    css_content = """body { background-color: white; color: black;}
+    if isinstance(tags, ChainMap):
+        return [path for tag_map in tags.maps for path in freeze_tags(tag_map, table_dir, tables)]
+    if id(tags) not in tables:
+        tables[id(tags)] = os.path.join(table_dir, f"{len(tables)}.tbl")
+        write_table(tables[id(tags)], tags)
+    return [tables[id(tags)]]
+
+def open_tags(paths, tables):
+    """
+    The tag map of the tables in paths, see freeze_tags().  tables maps
+    the paths of the tables opened before to them, so that every table is
+    mapped once.
+    """
+    for path in paths:
+        if path not in tables:
+            tables[path] = FrozenTagTable.open(path)
+    if len(paths) == 1:
+        return tables[paths[0]]
+    return ChainMap(*(tables[path] for path in paths))
+
+# The converters of a worker process, one per group, see convert_worker_init()
+worker_converters = []
+
+def convert_worker_init(groups):
+    """
+    Worker process setup: make the converter of every group, attached to
+    the frozen tag tables instead of receiving or rebuilding the tag maps.
+    groups holds, per group, the tables of the tag map, those of the
+    translations, language -> tables, and the other Converter arguments.
+    """
+    global worker_converters
+    tables = {}
+    worker_converters = []
+    for tag_paths, language_paths, settings in groups:
+        languages = {language: open_tags(paths, tables) for language, paths in language_paths.items()}
+        worker_converters.append(Converter(open_tags(tag_paths, tables), *settings, languages))
+
+def convert_worker(task):
+    """
+    Converts one file, a (group, file_arg) task, in a worker process and
+    hands back what Converter.convert() returns.
+    """
+    group, file_arg = task
+    print(f"Processing {file_arg}...")
+    return worker_converters[group].convert(file_arg, output)
+
+def convert_parallel(groups, jobs, journal=None):
+    """
+    Converts the files of groups, see convert_files(), with one pool of
+    jobs worker processes for all of them.
+    The tag maps, and those of every translation, are frozen into table
+    files that every worker maps read-only, so memory per worker does not
+    grow with the tag count.  A layer shared by groups, like the base
+    layer under the plugin tags, is frozen and mapped once.
+    A journal is used like convert_files() does.
+    """
+    with tempfile.TemporaryDirectory(prefix="vim2html") as table_dir:
+        tables = {}
+        worker_groups = []
+        for converter, text_files, key in groups:
+            language_paths = {language: freeze_tags(tags, table_dir, tables)
+                              for language, tags in converter.languages.items()}
+            settings = (converter.strategy, converter.date, converter.formats, converter.cache_dir,
+                        converter.line_index, converter.with_snippets)
+            worker_groups.append((freeze_tags(converter.tags, table_dir, tables), language_paths,
+                                  settings))
+
+        tasks = [(group, file_arg, key) for group, (_, text_files, key) in enumerate(groups)
+                 for file_arg in text_files]
+        lookups = {}
+        if journal is not None:
+            lookups = {(group, file_arg): journal_lookup(journal, key, file_arg)
+                       for group, file_arg, key in tasks}
+
+        with multiprocessing.Pool(jobs, convert_worker_init, (worker_groups,)) as pool:
+            todo = [(group, file_arg) for group, file_arg, _ in tasks
+                    if lookups.get((group, file_arg), (None, None))[1] is None]
+            # Results come in file order, skipped files are merged in
+            # between them in the same order
+            results = pool.imap(convert_worker, todo)
+            for group, file_arg, _ in tasks:
+                file_key, entry = lookups.get((group, file_arg), (None, None))
+                if entry is not None:
+                    print(f"Skipping {file_arg}, converted before.")
+                    merge_found(entry["bad_links"], entry["snippets"])
+                    continue
+                found, found_snippets, written = next(results)
+                merge_found(found, found_snippets)
+                if journal is not None:
+                    journal.record(file_arg, file_key, written, bad_links=found, snippets=found_snippets)
+
+def write_badlink_report(report_file):
+    """
+    Writes one line per unknown link target: the tag, the pages linking to
+    it and the closest existing tags.
+    """
+    index = TagIndex(url_map)
+    try:
+        with open(report_file, 'w', encoding='utf-8') as report_f:
+            for tag in sorted(bad_links):
+                if tag.split() != [tag]:
+                    # |...| spans with white space are table art, not links
+                    continue
+                suggestions = index.suggest(tag)
+                report_f.write(f"{tag}\t{' '.join(bad_links[tag])}\t{' '.join(suggestions)}\n")
+    except IOError as e:
+        raise ConversionError(f"Couldn't write to {report_file}: {e}")
+
+def parse_args(argv):
+    """
+    Parses the command line.
+    """
+    parser = argparse.ArgumentParser(
+        prog="vim2html.py",
+        description="converts vim documentation to HTML.")
+    parser.add_argument("tagfile", metavar="<tag file>",
+                        help="the English tags; translated help (foo.jax, ...) also uses tags-xy "
+                        "next to it, and its pages go into the directory xy")
+    parser.add_argument("textfiles", metavar="<text file>", nargs="*")
+    parser.add_argument("--tags", action="append", default=[], metavar="FILE", dest="tag_layers",
+                        help="also read tags from FILE for the <text file>s, looked up before "
+                        "<tag file>; when given more than once, the first one wins")
+    parser.add_argument("--plugin", action="append", default=[], metavar="DIR", dest="plugins",
+                        help="also convert the help files in DIR, linked with the tags file "
+                        "DIR/tags over <tag file>; may be given once per plugin")
+    parser.add_argument("--badlink-report", metavar="FILE",
+                        help="write unknown link targets with the closest existing tags to FILE")
+    parser.add_argument("--format", default="html",
+                        help="comma separated output formats out of: " + ", ".join(EMITTERS)
+                        + " (default: html)")
+    parser.add_argument("--cache-dir", metavar="DIR",
+                        help="keep parsed token streams and the tags of <tag file> in DIR and reuse "
+                        "them for unchanged input")
+    parser.add_argument("-j", "--jobs", type=int, default=1, metavar="N",
+                        help="convert with N worker processes sharing one read-only tag table")
+    parser.add_argument("--async", type=int, dest="async_limit", metavar="N",
+                        help="read and write files concurrently with asyncio, up to N files at a time")
+    parser.add_argument("--strategy", default="reference", choices=["reference"] + list(STRATEGIES),
+                        help="how to render pages, see strategies.py (default: reference)")
+    parser.add_argument("--no-stamp", action="store_true",
+                        help="leave out the \"Generated by vim2html on <date>\" line, for output "
+                        "that only changes with the input")
+    parser.add_argument("--line-index", action="store_true",
+                        help="also write a .lidx line index per file, for rendering parts of it")
+    parser.add_argument("--snippets", metavar="DIR",
+                        help="write tag preview snippets into DIR, sharded by tag hash")
+    parser.add_argument("--journal", metavar="FILE",
+                        help="record converted files in FILE and skip those recorded when run again")
+    parser.add_argument("--archive", metavar="FILE",
+                        help="write all pages and the stylesheet into the archive FILE "
+                        "(.zip, .tar, .tar.gz, .tar.bz2 or .tar.xz)")
+    parser.add_argument("--store", metavar="DIR",
+                        help="write all files as content-addressed blobs into the store DIR, "
+                        "shared by builds, and list them in the --manifest (see store.py)")
+    parser.add_argument("--manifest", metavar="FILE",
+                        help="the manifest of this build for --store")
+    args = parser.parse_args(argv)
+
+    if not args.textfiles and not args.plugins:
+        parser.error("no <text file> or --plugin to convert")
+    if bool(args.store) != bool(args.manifest):
+        parser.error("--store and --manifest go together")
+    if args.store:
+        for option, value in (("--archive", args.archive), ("--jobs", args.jobs > 1),
+                              ("--journal", args.journal)):
+            if value:
+                parser.error(f"--store can't be combined with {option}")
+
+    if args.archive and args.jobs > 1:
+        parser.error("--archive can't be combined with --jobs")
+    if args.archive and args.journal:
+        parser.error("--archive can't be combined with --journal")
+    if args.async_limit is not None:
+        if args.async_limit < 1:
+            parser.error("--async needs at least 1 file at a time")
+        if args.jobs > 1:
+            parser.error("--async can't be combined with --jobs")
+        if args.archive:
+            parser.error("--async can't be combined with --archive")
+
+    args.formats = args.format.split(",")
+    for fmt in args.formats:
+        if fmt not in EMITTERS:
+            parser.error(f"unknown output format '{fmt}'")
+    if args.strategy != "reference" and (args.formats != ["html"] or args.line_index or args.snippets):
+        parser.error(f"the {args.strategy} strategy only writes html pages")
+    if "html" in args.formats and "compact" in args.formats:
+        parser.error("html and compact output both write .html files")
+    return args
+
+# The stylesheet write_css() writes, Perl's writeCSS content
+STYLESHEET = """body { background-color: white; color: black;}
 :link { color: rgb(0,137,139); }
 :visited { color: rgb(0,100,100);
            background-color: white; /* should be inherit */ }
@@ -264,42 +1301,166 @@ h3, h4, h5, h6 { color: rgb(82,80,82); }
 .sub {}
 .badlink { color: rgb(0,37,39); }
 """
+
+def compact_css(css):
+    """
+    Rewrites the stylesheet for the compact HTML output: class selectors
+    renamed to COMPACT_CLASS_NAMES, rules for classes the output never uses
+    dropped, comments and white space removed.
+    """
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    rules = []
+    for selectors, body in re.findall(r'([^{}]+)\{([^}]*)\}', css):
+        kept = []
+        for selector in selectors.split(','):
+            selector = selector.strip()
+            if all(name in COMPACT_CLASS_NAMES for name in re.findall(r'\.(\w+)', selector)):
+                kept.append(re.sub(r'\.(\w+)', lambda m: '.' + COMPACT_CLASS_NAMES[m.group(1)], selector))
+        body = re.sub(r'\s*([:;,])\s*', r'\1', ' '.join(body.split())).strip(';')
+        if kept and body:
+            rules.append(f"{','.join(kept)}{{{body}}}")
+    return "\n".join(rules) + "\n"
+
+def write_css(compact=False, directory=""):
+    """
+    Writes the CSS stylesheet file, for the compact HTML output if compact,
+    into directory of the output, for the pages of a translation.
+    Corresponds to Perl's writeCSS sub.
+    """
+    css_content = STYLESHEET
+    if compact:
+        css_content = compact_css(css_content)
     try:
-        with open("vim-stylesheet.css", "w", encoding='utf-8') as css_f:
-            css_f.write(css_content)
+        output.write(f"{directory}/vim-stylesheet.css" if directory else "vim-stylesheet.css", css_content)
     except IOError as e:
-        print(f"Couldn't write stylesheet: {e}", file=sys.stderr)
-        sys.exit(1)
+        raise ConversionError(f"Couldn't write stylesheet: {e}")
 
-def main():
+def source_date_epoch():
     """
-    Main execution block.
+    The SOURCE_DATE_EPOCH environment variable as seconds since 1970, or
+    None when it isn't set.  Builds that set it give the same output for
+    the same input.
     """
-    global current_day, current_month, current_year
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if epoch is None:
+        return None
+    try:
+        seconds = int(epoch)
+        datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        raise ConversionError(f"Invalid SOURCE_DATE_EPOCH '{epoch}': expected seconds since 1970")
+    return seconds
 
-    # Initialize date components
-    now = datetime.datetime.now()
-    current_year = str(now.year)
-    current_month = str(now.month).zfill(2) #Ensure two digits for month
-    current_day = str(now.day).zfill(2)     #Ensure two digits for day
+def build_date():
+    """
+    The date to stamp pages with: today, or the UTC date of
+    source_date_epoch() when it is set.
+    """
+    epoch = source_date_epoch()
+    if epoch is None:
+        return datetime.date.today()
+    return datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc).date()
+
+def run(args):
+    """
+    Does what the parsed command line args ask for.
+    """
+    global current_day, current_month, current_year, output, strategy
 
+    strategy = args.strategy
 
-    if len(sys.argv) < 3: # Script name + tag file + at least one text file
-        usage()
+    # Initialize date components
+    if not args.no_stamp:
+        now = build_date()
+        current_year = str(now.year)
+        current_month = str(now.month).zfill(2) #Ensure two digits for month
+        current_day = str(now.day).zfill(2)     #Ensure two digits for day
 
-    tag_file_arg = sys.argv[1]
-    text_files_args = sys.argv[2:]
+    if args.archive:
+        try:
+            output = ArchiveOutput(args.archive, source_date_epoch())
+        except IOError as e:
+            raise ConversionError(f"Couldn't write to {args.archive}: {e}")
+    elif args.store:
+        output = StoreOutput(args.store, args.manifest)
 
     print("Processing tags...")
-    read_tag_file(tag_file_arg)
-
-    for file_arg in text_files_args:
-        print(f"Processing {file_arg}...")
-        vim2html(file_arg)
-    
-    print("Writing stylesheet...")
-    write_css()
+    base = load_tag_layers(args.tagfile, args.tag_layers, args.cache_dir)
+    # Groups of files converted with the same tags: the <text file>s, then
+    # the help of every plugin over the same base layer
+    groups = []
+    if args.textfiles:
+        groups.append((url_map, args.tag_layers + [args.tagfile], args.textfiles))
+    for directory in args.plugins:
+        layer_files, text_files = plugin_help(directory)
+        groups.append((layer_tags(base, layer_files), layer_files + [args.tagfile], text_files))
+
+    journal = None
+    if args.journal:
+        try:
+            journal = Journal(args.journal)
+        except IOError as e:
+            raise ConversionError(f"Couldn't open journal {args.journal}: {e}")
+
+    all_languages = set()
+    conversions = []
+    for tags, tagfiles, text_files in groups:
+        # Translations are looked up in their own tags-xy, then in the
+        # English tags of the group
+        languages = {}
+        language_files = []
+        for language in sorted({help_language(file_arg) for file_arg in text_files} - {""}):
+            languages[language], found = load_language_tags(tagfiles, language)
+            language_files += found
+        all_languages.update(languages)
+        converter = Converter(tags, strategy, global_state().date, args.formats, args.cache_dir,
+                              args.line_index, bool(args.snippets), languages)
+
+        key = None
+        if journal is not None:
+            key = run_key(tagfiles + language_files, converter)
+        conversions.append((converter, text_files, key))
+
+    if args.jobs > 1:
+        convert_parallel(conversions, args.jobs, journal)
+    elif args.async_limit:
+        asyncio.run(convert_async(conversions, args.async_limit, journal))
+    else:
+        convert_files(conversions, journal)
+
+    if journal is not None:
+        journal.close()
+
+    if "html" in args.formats or "compact" in args.formats:
+        print("Writing stylesheet...")
+        for directory in [""] + sorted(all_languages):
+            write_css("compact" in args.formats, directory)
+
+    try:
+        output.close()
+    except IOError as e:
+        raise ConversionError(f"Couldn't write to {args.archive or args.manifest}: {e}")
+
+    if args.snippets:
+        print(f"Writing tag snippets to {args.snippets}...")
+        write_snippets(args.snippets)
+
+    if args.badlink_report:
+        print(f"Writing broken link report to {args.badlink_report}...")
+        write_badlink_report(args.badlink_report)
     print("done.")
 
+def main(argv=None):
+    """
+    Main execution block.
+    argv are the arguments, sys.argv[1:] by default.
+    """
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    try:
+        run(args)
+    except ConversionError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()